@@ -0,0 +1,308 @@
+"""End-to-end load benchmark of /ws/blogger against local stand-ins, runs offline and reproducibly.
+
+Starts the stand-in OpenAI-compatible server, SearxNG and static sites in this process, launches genesis-mesh as a
+subprocess pointed at them and drives concurrent sessions of blog runs over the WebSocket. Reports run latency and
+time to first update percentiles, throughput and the server's peak RSS. Results are written as JSON labelled with
+the commit they were measured on, so two commits are compared by running the same command on each:
+
+    python benchmarks/end_to_end.py --sessions 8 --runs 4 --output main.json
+    python benchmarks/end_to_end.py --sessions 8 --runs 4 --output branch.json --compare main.json
+
+Caches are disabled and every run gets its own topic, so each run does the full work. Settings of the server under
+test can be overridden with --server-env, e.g. --server-env GENESIS_MESH_MAX_ACTIVE_RUNS=8.
+"""
+
+import sys
+from argparse import ArgumentParser
+from asyncio import StreamReader, create_subprocess_exec, create_task, gather, run, sleep, wait_for
+from asyncio.subprocess import PIPE, STDOUT
+from collections import deque
+from datetime import UTC, datetime
+from json import dumps, loads
+from os import environ
+from pathlib import Path
+from platform import python_version
+from resource import RUSAGE_CHILDREN, getrusage
+from socket import socket
+from subprocess import run as run_process
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import numpy as np
+from aiohttp import ClientError, ClientSession, web
+from websockets.asyncio.client import connect
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_openai import create_app as create_openai_app
+from fake_searxng import create_app as create_searxng_app
+from fake_sites import create_app as create_sites_app
+
+HOST = "127.0.0.1"
+PERCENTILES = (50, 95, 99)
+# Messages that are about the run rather than part of it, they do not count as the first update
+CONTROL_MESSAGE_TYPES = frozenset({"run", "queued"})
+SERVER_START_TIMEOUT_SECONDS = 120
+SERVER_OUTPUT_LINES = 100
+
+
+def free_port() -> int:
+    with socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def git(*args: str) -> str:
+    result = run_process(["git", *args], capture_output=True, text=True, check=False, cwd=Path(__file__).parent)  # noqa: S607
+    return result.stdout.strip()
+
+
+def summarize(values: list[float]) -> dict[str, float] | None:
+    if not values:
+        return None
+    return {
+        **{f"p{percentile}": float(np.percentile(values, percentile)) for percentile in PERCENTILES},
+        "mean": float(np.mean(values)),
+        "max": float(np.max(values)),
+    }
+
+
+async def read_output(stream: StreamReader, lines: deque[str]):
+    async for line in stream:
+        lines.append(line.decode(errors="replace"))
+
+
+async def start_stand_in(app: web.Application) -> tuple[web.AppRunner, str]:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    port = free_port()
+    await web.TCPSite(runner, HOST, port).start()
+    return runner, f"http://{HOST}:{port}"
+
+
+async def wait_until_ready(http_client: ClientSession, url: str, server):
+    started = perf_counter()
+    while perf_counter() - started < SERVER_START_TIMEOUT_SECONDS:
+        if server.returncode is not None:
+            msg = f"genesis-mesh exited with {server.returncode} during startup"
+            raise RuntimeError(msg)
+        try:
+            async with http_client.get(url) as response:
+                if response.status == 200:  # noqa: PLR2004
+                    return
+        except ClientError:
+            pass
+        await sleep(0.2)
+    msg = "genesis-mesh did not start in time"
+    raise TimeoutError(msg)
+
+
+async def run_blog(ws_url: str, request: dict, *, compression: str | None) -> dict:
+    started = perf_counter()
+    first_update = None
+    messages = 0
+    received_bytes = 0
+    error = None
+    async with connect(ws_url, max_size=None, compression=compression) as ws:
+        await ws.send(dumps(request))
+        async for message in ws:
+            messages += 1
+            received_bytes += len(message)
+            payload = loads(message)
+            if isinstance(payload, dict):
+                if "error" in payload:
+                    error = payload["error"]
+                if payload.get("type") in CONTROL_MESSAGE_TYPES or "error" in payload:
+                    continue
+            if first_update is None:
+                first_update = perf_counter() - started
+    return {
+        "seconds": perf_counter() - started,
+        "first_update_seconds": first_update,
+        "messages": messages,
+        "bytes": received_bytes,
+        "error": error,
+    }
+
+
+async def run_session(ws_url: str, session: int, runs: int, request: dict, *, compression: str | None) -> list[dict]:
+    results = []
+    for idx in range(runs):
+        topic = f"Benchmark topic {session} run {idx}"
+        try:
+            results.append(await run_blog(ws_url, {**request, "topic": topic}, compression=compression))
+        except (OSError, ClientError) as e:
+            results.append({"error": repr(e)})
+    return results
+
+
+async def benchmark(args) -> dict:
+    stand_ins = {
+        "llm": await start_stand_in(
+            create_openai_app(
+                first_token_latency=args.llm_first_token_latency,
+                tokens_per_second=args.llm_tokens_per_second,
+                completion_tokens=args.llm_completion_tokens,
+                sections=args.sections,
+            )
+        ),
+        "sites": await start_stand_in(create_sites_app(latency=args.page_latency, paragraphs=args.page_paragraphs)),
+    }
+    stand_ins["searxng"] = await start_stand_in(
+        create_searxng_app(
+            latency=args.search_latency, results=args.search_results, pages_url=f"{stand_ins['sites'][1]}/page"
+        )
+    )
+
+    with TemporaryDirectory() as work_dir:
+        port = free_port()
+        env = {
+            **environ,
+            "OPENAI_API_BASE_URL": f"{stand_ins['llm'][1]}/v1",
+            "SEARXNG_BASE_URL": stand_ins["searxng"][1],
+            # Fixture pages are server rendered, a browser is only launched should a page need one
+            "CRAWLER_BROWSER_POOL_SIZE": "0",
+            # Every fixture page is on the same host, per-host politeness would only measure itself
+            "CRAWLER_MAX_CONCURRENT_FETCHES_PER_HOST": "64",
+            "CRAWLER_PER_HOST_REQUESTS_PER_SECOND": "1000",
+            "CRAWLER_PER_HOST_BURST": "1000",
+            "CRAWLER_CACHE_ENABLED": "false",
+            "SEARXNG_CACHE_ENABLED": "false",
+            "BLOGGER_RESULT_CACHE_ENABLED": "false",
+            "OPENAI_RESPONSE_CACHE_ENABLED": "false",
+            "CRAWLER_CACHE_DIR": f"{work_dir}/crawler",
+            "GENESIS_MESH_CHECKPOINT_PATH": f"{work_dir}/checkpoints.sqlite",
+            **dict(setting.split("=", 1) for setting in args.server_env),
+        }
+        server = await create_subprocess_exec(
+            sys.executable,
+            "-m",
+            "genesis_mesh",
+            "--host",
+            HOST,
+            "--port",
+            str(port),
+            env=env,
+            stdout=PIPE,
+            stderr=STDOUT,
+        )
+        # Only shown when the benchmark fails, the tail is all that is needed to see why
+        server_output: deque[str] = deque(maxlen=SERVER_OUTPUT_LINES)
+        output_reader = create_task(read_output(server.stdout, server_output))
+        try:
+            async with ClientSession() as http_client:
+                await wait_until_ready(http_client, f"http://{HOST}:{port}/stats", server)
+                ws_url = f"ws://{HOST}:{port}/ws/blogger"
+                request = {"stream_tokens": args.stream_tokens, "encoding": args.encoding}
+                compression = None if args.no_compression else "deflate"
+                for idx in range(args.warmup):
+                    await run_blog(ws_url, {**request, "topic": f"Warmup topic {idx}"}, compression=compression)
+
+                started = perf_counter()
+                sessions = await gather(
+                    *[
+                        run_session(ws_url, session, args.runs, request, compression=compression)
+                        for session in range(args.sessions)
+                    ]
+                )
+                wall_seconds = perf_counter() - started
+
+                stand_in_stats = {}
+                for name, (_, url) in stand_ins.items():
+                    async with http_client.get(f"{url}/stats") as response:
+                        stand_in_stats[name] = await response.json()
+        except BaseException:
+            print("".join(server_output), file=sys.stderr)
+            raise
+        finally:
+            if server.returncode is None:
+                server.terminate()
+                await wait_for(server.wait(), timeout=30)
+            await output_reader
+        for runner, _ in stand_ins.values():
+            await runner.cleanup()
+
+    # Linux reports the peak RSS of waited-for children in KiB, macOS in bytes
+    peak_rss = getrusage(RUSAGE_CHILDREN).ru_maxrss / (1024 if sys.platform != "darwin" else 1024 * 1024)
+    results = [result for session in sessions for result in session]
+    completed = [result for result in results if not result.get("error")]
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "measured_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": python_version(),
+        "config": {name: value for name, value in vars(args).items() if name not in {"output", "compare"}},
+        "runs": len(results),
+        "completed": len(completed),
+        "errors": sorted({result["error"] for result in results if result.get("error")}),
+        "wall_seconds": wall_seconds,
+        "throughput_runs_per_minute": len(completed) / wall_seconds * 60,
+        "run_seconds": summarize([result["seconds"] for result in completed]),
+        "time_to_first_update_seconds": summarize(
+            [result["first_update_seconds"] for result in completed if result["first_update_seconds"] is not None]
+        ),
+        "messages_per_run": summarize([result["messages"] for result in completed]),
+        "bytes_per_run": summarize([result["bytes"] for result in completed]),
+        "server_peak_rss_mb": peak_rss,
+        "stand_ins": stand_in_stats,
+    }
+
+
+def headline(report: dict) -> dict[str, float | None]:
+    metrics: dict[str, float | None] = {
+        "throughput_runs_per_minute": report["throughput_runs_per_minute"],
+        "server_peak_rss_mb": report["server_peak_rss_mb"],
+    }
+    for name in ("run_seconds", "time_to_first_update_seconds", "bytes_per_run"):
+        for percentile in PERCENTILES:
+            metrics[f"{name}.p{percentile}"] = (report[name] or {}).get(f"p{percentile}")
+    return metrics
+
+
+def print_report(report: dict, baseline: dict | None):
+    print(
+        f"commit {report['commit']}{' (dirty)' if report['dirty'] else ''}: {report['completed']}/{report['runs']} runs"
+    )
+    for error in report["errors"]:
+        print(f"  error: {error}")
+    baseline_metrics = headline(baseline) if baseline else {}
+    if baseline:
+        print(f"compared with {baseline['commit']}{' (dirty)' if baseline['dirty'] else ''}")
+        print(f"  {'metric':<40} {'current':>12} {'baseline':>12} {'change':>8}")
+    for name, value in headline(report).items():
+        line = f"  {name:<40} {value:>12.3f}" if value is not None else f"  {name:<40} {'-':>12}"
+        if (previous := baseline_metrics.get(name)) and value is not None:
+            line += f" {previous:>12.3f} {(value - previous) / previous:>+8.1%}"
+        print(line)
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark /ws/blogger end to end against local stand-ins")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent WebSocket sessions")
+    parser.add_argument("--runs", type=int, default=2, help="Blog runs per session, one after the other")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs before the measurement")
+    parser.add_argument("--sections", type=int, default=4)
+    parser.add_argument("--stream-tokens", action="store_true")
+    parser.add_argument("--encoding", type=str, default="legacy")
+    parser.add_argument("--no-compression", action="store_true", help="Do not negotiate permessage-deflate")
+    parser.add_argument("--llm-first-token-latency", type=float, default=0.2)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--llm-completion-tokens", type=int, default=200)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    parser.add_argument("--search-results", type=int, default=5)
+    parser.add_argument("--page-latency", type=float, default=0.05)
+    parser.add_argument("--page-paragraphs", type=int, default=30)
+    parser.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument("--compare", type=Path, help="Results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    report = run(benchmark(args))
+    baseline = loads(args.compare.read_text()) if args.compare else None
+    print_report(report, baseline)
+    if args.output:
+        args.output.write_text(dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
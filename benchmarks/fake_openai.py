@@ -0,0 +1,147 @@
+"""Stand-in OpenAI-compatible chat completions server for running the blogger without a real model.
+
+Streams completions as server-sent events at a configurable token rate after a configurable first token latency.
+Structured output requests are answered with a tool call: a blog plan of `--sections` sections for `Sections`, and
+search queries for `Queries`. Text is generated deterministically from the prompt, so runs are reproducible:
+
+    python benchmarks/fake_openai.py --port 8070 --tokens-per-second 50 --first-token-latency 0.3
+    OPENAI_API_BASE_URL=http://localhost:8070/v1 genesis-mesh
+"""
+
+from argparse import ArgumentParser
+from asyncio import sleep
+from json import dumps
+from random import Random
+from time import time
+from zlib import crc32
+
+from aiohttp import web
+
+WORDS = (
+    "latency throughput cache queue token stream section research source crawl search model graph node agent "
+    "budget window context prompt schema update client server memory batch pool worker request response"
+).split()
+# Longest gap between two streamed chunks, faster token rates send several tokens per chunk instead
+MAX_CHUNK_INTERVAL_SECONDS = 0.05
+
+
+def create_app(
+    first_token_latency: float = 0.0,
+    tokens_per_second: float = 200.0,
+    completion_tokens: int = 200,
+    sections: int = 4,
+    seed: int = 0,
+) -> web.Application:
+    stats = {"completions": 0, "tool_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def plan():
+        # Introduction and conclusion are written from the research of the sections in between
+        names = ["Introduction", *(f"Part {idx}" for idx in range(1, sections - 1)), "Conclusion"][:sections]
+        return {
+            "sections": [
+                {
+                    "name": name,
+                    "description": f"What {name} covers",
+                    "research": name not in {"Introduction", "Conclusion"},
+                    "content": "",
+                }
+                for name in names
+            ]
+        }
+
+    def queries(rng: Random):
+        return {"queries": [{"search_query": " ".join(rng.choices(WORDS, k=3))} for _ in range(2)]}
+
+    async def chat_completions(request: web.Request):
+        body = await request.json()
+        prompt = "".join(str(message.get("content") or "") for message in body["messages"])
+        rng = Random(seed + crc32(prompt.encode()))  # noqa: S311
+        prompt_tokens = len(prompt) // 4
+        stats["completions"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+
+        tool_call = None
+        if tools := body.get("tools"):
+            name = tools[0]["function"]["name"]
+            stats["tool_calls"] += 1
+            arguments = plan() if name == "Sections" else queries(rng)
+            tool_call = {"id": "call_0", "type": "function", "function": {"name": name, "arguments": dumps(arguments)}}
+            tokens = [tool_call["function"]["arguments"]]
+        else:
+            tokens = [f"{word} " for word in rng.choices(WORDS, k=completion_tokens)]
+        stats["completion_tokens"] += len(tokens)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+        base = {"id": f"chatcmpl-{stats['completions']}", "created": int(time()), "model": body["model"]}
+
+        await sleep(first_token_latency)
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": None if tool_call else "".join(tokens)}
+            if tool_call:
+                message["tool_calls"] = [tool_call]
+            return web.json_response(
+                {
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [
+                        {"index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"}
+                    ],
+                    "usage": usage,
+                }
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        async def send(choices: list[dict], **extra):
+            chunk = {**base, "object": "chat.completion.chunk", "choices": choices, **extra}
+            await response.write(f"data: {dumps(chunk)}\n\n".encode())
+
+        if tool_call:
+            await send([{"index": 0, "delta": {"role": "assistant", "tool_calls": [{"index": 0, **tool_call}]}}])
+        else:
+            interval = min(1 / tokens_per_second, MAX_CHUNK_INTERVAL_SECONDS)
+            per_chunk = max(round(tokens_per_second * interval), 1)
+            for idx in range(0, len(tokens), per_chunk):
+                if idx:
+                    await sleep(interval)
+                await send([{"index": 0, "delta": {"content": "".join(tokens[idx : idx + per_chunk])}}])
+        await send([{"index": 0, "delta": {}, "finish_reason": "tool_calls" if tool_call else "stop"}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            await send([], usage=usage)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def get_stats(_: web.Request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def main():
+    parser = ArgumentParser(description="Run a stand-in OpenAI-compatible chat completions server")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8070)
+    parser.add_argument("--first-token-latency", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--completion-tokens", type=int, default=200)
+    parser.add_argument("--sections", type=int, default=4)
+    args = parser.parse_args()
+
+    app = create_app(
+        first_token_latency=args.first_token_latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        sections=args.sections,
+    )
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Stand-in SearxNG instance for exercising the search client without a real deployment.
+
+Answers /search with deterministic JSON results and /healthz with 200. Latency, jitter and a failure rate can be set
+per instance, so several of these can be started on different ports to watch load balancing and circuit breaking:
+
+    python benchmarks/fake_searxng.py --port 8081 --latency 0.05
+    python benchmarks/fake_searxng.py --port 8082 --latency 0.5 --fail-rate 0.3
+    SEARXNG_BASE_URLS='["http://localhost:8081", "http://localhost:8082"]' genesis-mesh
+"""
+
+from argparse import ArgumentParser
+from asyncio import sleep
+from random import Random
+
+from aiohttp import web
+
+
+def create_app(
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    fail_rate: float = 0.0,
+    results: int = 5,
+    pages_url: str = "http://localhost:8090/page",
+    seed: int = 0,
+) -> web.Application:
+    rng = Random(seed)  # noqa: S311
+    stats = {"searches": 0, "failures": 0}
+
+    async def search(request: web.Request):
+        stats["searches"] += 1
+        await sleep(latency + rng.uniform(0, jitter))
+        if rng.random() < fail_rate:
+            stats["failures"] += 1
+            raise web.HTTPServiceUnavailable
+        query = request.query.get("q", "")
+        slug = "-".join(query.split()) or "empty"
+        return web.json_response(
+            {
+                "query": query,
+                "results": [
+                    {
+                        "url": f"{pages_url}/{slug}-{idx}",
+                        "title": f"{query} result {idx}",
+                        "content": f"Summary of result {idx} for {query}",
+                        "score": 1.0 - idx / (results * 2),
+                    }
+                    for idx in range(results)
+                ],
+            }
+        )
+
+    async def healthz(_: web.Request):
+        return web.Response(text="OK")
+
+    async def get_stats(_: web.Request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_get("/search", search)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def main():
+    parser = ArgumentParser(description="Run a stand-in SearxNG instance")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--results", type=int, default=5)
+    parser.add_argument("--pages-url", type=str, default="http://localhost:8090/page")
+    args = parser.parse_args()
+
+    app = create_app(
+        latency=args.latency,
+        jitter=args.jitter,
+        fail_rate=args.fail_rate,
+        results=args.results,
+        pages_url=args.pages_url,
+    )
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Static-site fixture server the crawler can fetch pages from without the internet.
+
+Serves a deterministic article for every path under /page/, which is where the stand-in SearxNG points its results.
+Pages are plain server-rendered HTML, so the crawler's HTTP fast path handles them without a browser:
+
+    python benchmarks/fake_sites.py --port 8090 --paragraphs 40 --latency 0.05
+"""
+
+from argparse import ArgumentParser
+from asyncio import sleep
+from random import Random
+from zlib import crc32
+
+from aiohttp import web
+
+WORDS = (
+    "the a of and to in performance system design data network storage compute request cache index query result "
+    "page server client latency memory process thread event loop queue batch stream model benchmark measurement"
+).split()
+
+
+def create_app(latency: float = 0.0, paragraphs: int = 30, words_per_paragraph: int = 60, seed: int = 0):
+    stats = {"pages": 0, "bytes": 0}
+
+    async def page(request: web.Request):
+        stats["pages"] += 1
+        slug = request.match_info["slug"]
+        rng = Random(seed + crc32(slug.encode()))  # noqa: S311
+        await sleep(latency)
+        body = "".join(
+            f"<h2>{slug} part {idx}</h2>"
+            if idx % 10 == 0
+            else f"<p>{' '.join(rng.choices(WORDS, k=words_per_paragraph))}</p>"
+            for idx in range(paragraphs)
+        )
+        html = (
+            f"<html><head><title>{slug}</title></head><body><nav><a href='/'>Home</a></nav>"
+            f"<article><h1>{slug}</h1>{body}</article><footer>Fixture</footer></body></html>"
+        )
+        stats["bytes"] += len(html)
+        return web.Response(text=html, content_type="text/html")
+
+    async def get_stats(_: web.Request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_get("/page/{slug}", page)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def main():
+    parser = ArgumentParser(description="Run the static-site fixture server")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--paragraphs", type=int, default=30)
+    parser.add_argument("--words-per-paragraph", type=int, default=60)
+    args = parser.parse_args()
+
+    app = create_app(latency=args.latency, paragraphs=args.paragraphs, words_per_paragraph=args.words_per_paragraph)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Micro-benchmark for joining search results with crawl results and formatting them into the writer prompt.
+
+Compares the current implementation with the previous nested-loop join and `+=` formatter.
+
+    python benchmarks/source_formatting.py --sources 60 --duplicates 3 --content-chars 20000
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter
+from tracemalloc import get_traced_memory, reset_peak, start, stop
+
+from genesis_mesh.agents.blogger.utils import UtilityFunctions, merge_crawled_content
+from genesis_mesh.utils.tokens import TokenBudget
+
+
+def legacy_join(search_results: list[dict[str, str]], web_crawler_results: list[dict[str, str]]):
+    return [{**d1, **d2} for d1 in search_results for d2 in web_crawler_results if d1["url"] == d2["url"]]
+
+
+def legacy_format(search_response: list[dict[str, str]], max_tokens_per_source: int):
+    unique_sources: dict[str, dict[str, str]] = {}
+    for source in search_response:
+        if source["url"] not in unique_sources:
+            unique_sources[source["url"]] = source
+
+    formatted_text = "Sources:\n\n"
+    for source in unique_sources.values():
+        formatted_text += f"Source {source['title']}:\n===\n"
+        formatted_text += f"URL: {source['url']}\n===\n"
+        formatted_text += f"Content summary from source: {source['summary']}\n===\n"
+        char_limit = max_tokens_per_source * 4
+        content = source.get("content")
+        if content is None:
+            content = ""
+        if len(content) > char_limit:
+            content = content[:char_limit] + "... [truncated]"
+        formatted_text += f"Content from source: {content}\n\n"
+    return formatted_text.strip()
+
+
+def build_fixture(sources: int, duplicates: int, content_chars: int):
+    # The same URL is returned by several queries, which is what made the nested join emit duplicate rows
+    search_results = [
+        {"url": f"https://example.com/{i}", "title": f"Title {i}", "summary": f"Summary {i} " * 20}
+        for _ in range(duplicates)
+        for i in range(sources)
+    ]
+    crawl_results = [
+        {"url": f"https://example.com/{i}", "content": (f"Paragraph {i}. " * content_chars)[:content_chars]}
+        for i in range(sources)
+    ]
+    return search_results, crawl_results
+
+
+def measure(fn, repeat: int):
+    start()
+    reset_peak()
+    started = perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (perf_counter() - started) / repeat
+    _, peak = get_traced_memory()
+    stop()
+    return elapsed, peak
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark source joining and formatting")
+    parser.add_argument("--sources", type=int, default=60)
+    parser.add_argument("--duplicates", type=int, default=3)
+    parser.add_argument("--content-chars", type=int, default=20000)
+    # Large enough that nothing is truncated, the legacy formatter truncates on a character estimate instead of tokens
+    parser.add_argument("--max-tokens-per-source", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    search_results, crawl_results = build_fixture(args.sources, args.duplicates, args.content_chars)
+    # Formatting never touches the tools
+    token_budget = TokenBudget(model="gpt-4o", context_window=131072, max_completion_tokens=8192)
+    util_functions = UtilityFunctions(search_tool=None, crawler_tool=None, token_budget=token_budget)  # type: ignore
+
+    def legacy():
+        joined = legacy_join(search_results, crawl_results)
+        return legacy_format(joined, args.max_tokens_per_source)
+
+    def current():
+        unique_results: dict[str, dict[str, str]] = {}
+        for result in search_results:
+            unique_results.setdefault(result["url"], result)
+        crawled = {result["url"]: result for result in crawl_results}
+        joined = merge_crawled_content(unique_results, crawled)
+        return util_functions.deduplicate_and_format_sources(
+            joined, args.max_tokens_per_source, include_raw_content=True
+        )
+
+    if legacy() != current():
+        parser.error("legacy and current implementations produce different prompts")
+
+    for name, fn in (("legacy", legacy), ("current", current)):
+        elapsed, peak = measure(fn, args.repeat)
+        print(f"{name:>8}: {elapsed * 1000:8.2f} ms/run  peak {peak / 1024 / 1024:8.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,52 @@
 from argparse import ArgumentParser
+from asyncio import FIRST_COMPLETED, create_task, gather, wait
+from contextlib import AsyncExitStack
 from logging import getLogger
+from time import perf_counter
 from typing import Annotated
 
 from aiohttp import ClientSession
-from fastapi import APIRouter, Depends, FastAPI, WebSocket
+from crawl4ai import BrowserConfig, CrawlerRunConfig  # type: ignore
+from fastapi import APIRouter, Depends, FastAPI, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.websockets import WebSocketState
+from httpx import Limits
+from openai import DefaultAsyncHttpxClient
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.status import WS_1013_TRY_AGAIN_LATER
 from uvicorn import run
 
 from genesis_mesh.agents.blogger import Blogger
+from genesis_mesh.agents.blogger.utils.llm_cache import LLMCache
+from genesis_mesh.agents.blogger.utils.result_cache import ResultCache
+from genesis_mesh.configs.agents.blogger import BloggerConfig
+from genesis_mesh.configs.llm import OpenAICompatibleAPIConfig
+from genesis_mesh.configs.server import ServerConfig
+from genesis_mesh.configs.tools.crawler import CrawlerConfig
+from genesis_mesh.configs.tools.searxng import SearxNGConfig
 from genesis_mesh.models import BloggerRequest
-from genesis_mesh.utils import build_request
+from genesis_mesh.tools.crawler import EXCLUDED_TAGS, WebCrawlerTool
+from genesis_mesh.tools.crawler.browser_pool import BrowserPool
+from genesis_mesh.tools.crawler.cache import CrawlCache
+from genesis_mesh.tools.crawler.http_fetcher import HttpFetcher
+from genesis_mesh.tools.crawler.scheduler import CrawlScheduler
+from genesis_mesh.tools.search_engine import SearxNGTool
+from genesis_mesh.tools.search_engine.instances import SearxNGInstancePool
+from genesis_mesh.utils import build_request, wait_for_disconnect
+from genesis_mesh.utils.admission import AdmissionController, QueueFullError
+from genesis_mesh.utils.cache import TTLCache
+from genesis_mesh.utils.checkpoint import CheckpointPruner, open_checkpointer
+from genesis_mesh.utils.watchdog import EventLoopWatchdog
 
 DEFAULT_HOST = "127.0.0.1"
 DEFAULT_PORT = "8080"
 
 
-def get_http_client(ws: WebSocket):
-    return ws.app.state.http_client_session
+def get_blogger(ws: WebSocket):
+    return ws.app.state.blogger
+
+
+def get_admission_controller(ws: WebSocket):
+    return ws.app.state.admission_controller
 
 
 logger = getLogger()
@@ -24,45 +55,236 @@ logger = getLogger()
 class GenesisMesh:
     def __init__(self):
         self.ws_api = APIRouter(prefix="/ws")
+        self.http_api = APIRouter()
 
     def setup(self):
+        @self.http_api.get(path="/stats")
+        async def get_stats(request: Request):
+            search_tool = request.app.state.search_tool
+            crawl_cache = request.app.state.crawler_tool.crawl_cache
+            return {
+                "crawler": request.app.state.crawler_tool.stats(),
+                "crawl_scheduler": request.app.state.crawler_tool.crawl_scheduler.stats(),
+                "browser_pool": request.app.state.crawler_tool.browser_pool.stats(),
+                "crawl_cache": crawl_cache.stats() if crawl_cache else None,
+                "search": search_tool.stats(),
+                "search_cache": search_tool.search_cache.stats() if search_tool.search_cache else None,
+                "search_single_flight": search_tool.single_flight.stats(),
+                "admission": request.app.state.admission_controller.stats(),
+                "blogger": request.app.state.blogger.stats(),
+                "result_cache": result_cache.stats()
+                if (result_cache := request.app.state.blogger.result_cache)
+                else None,
+                "llm_cache": request.app.state.blogger.llm_cache.stats(),
+                "checkpoint_pruner": pruner.stats() if (pruner := request.app.state.checkpoint_pruner) else None,
+                "event_loop_watchdog": watchdog.stats() if (watchdog := request.app.state.watchdog) else None,
+            }
+
+        @self.http_api.get(path="/metrics")
+        async def get_metrics():
+            return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
         @self.ws_api.websocket(path="/blogger")
         async def invoke_browser_agent(
             ws: WebSocket,
-            http_client: Annotated[ClientSession, Depends(get_http_client)],
+            blogger: Annotated[Blogger, Depends(get_blogger)],
+            admission_controller: Annotated[AdmissionController, Depends(get_admission_controller)],
         ):
-            blogger = Blogger(http_client=http_client)
             await ws.accept()
             try:
                 blogger_request = await build_request(ws, BloggerRequest)
-                async for state_update in blogger.invoke_agent(topic=blogger_request.topic):
-                    await ws.send_json(state_update)
+
+                async def notify_queued(position: int, eta_seconds: float | None):
+                    await ws.send_json({"type": "queued", "position": position, "eta_seconds": eta_seconds})
+
+                async def stream_updates():
+                    # Runs beyond the concurrency limit wait their turn, so a spike does not slow every run down
+                    async with admission_controller.slot(priority=blogger_request.priority, notify=notify_queued):
+                        async for state_update in blogger.invoke_agent(
+                            topic=blogger_request.topic,
+                            run_id=blogger_request.run_id,
+                            stream_tokens=blogger_request.stream_tokens,
+                            encoding=blogger_request.encoding,
+                            trace=blogger_request.trace,
+                            bypass_cache=blogger_request.bypass_cache,
+                        ):
+                            await ws.send_text(state_update)
+
+                # Watch the socket while the run streams, so a client that leaves cancels the run right away
+                # instead of at the next update
+                run = create_task(stream_updates())
+                disconnect = create_task(wait_for_disconnect(ws))
+                await wait({run, disconnect}, return_when=FIRST_COMPLETED)
+                if disconnect.done() and not run.done():
+                    cancelled_at = perf_counter()
+                    run.cancel()
+                    await gather(run, return_exceptions=True)
+                    logger.info("Client disconnected, run cancelled in %.3fs", perf_counter() - cancelled_at)
+                    return
+                disconnect.cancel()
+                await gather(disconnect, return_exceptions=True)
+                await run
+            except WebSocketDisconnect:
+                logger.info("Client disconnected")
+            except QueueFullError:
+                logger.warning("Rejecting blog run, the run queue is full")
+                await ws.send_json(data={"type": "rejected", "error": "Server is busy, try again later"})
+                await ws.close(code=WS_1013_TRY_AGAIN_LATER)
             except Exception as e:
                 logger.exception(msg="Error getting agent response")
                 await ws.send_json(data={"error": str(e)})
             finally:
-                await ws.close()
+                if WebSocketState.CONNECTED == ws.client_state == ws.application_state:
+                    await ws.close()
+
+    def __call__(self, host: str, port: int, *, debug: bool = False):
+        server_config = ServerConfig()
+        debug = debug or server_config.debug
 
-    def __call__(self, host: str, port: int):
         async def app_lifespan(app: FastAPI):
+            app.state.watchdog = None
+            if debug:
+                app.state.watchdog = EventLoopWatchdog(
+                    threshold_seconds=server_config.loop_block_threshold_ms / 1000,
+                    interval_seconds=server_config.loop_watchdog_interval_ms / 1000,
+                )
+                await app.state.watchdog.start()
+            crawler_config = CrawlerConfig()
+            searxng_config = SearxNGConfig()
+            openai_compatible_provider_config = OpenAICompatibleAPIConfig()
             app.state.http_client_session = ClientSession(raise_for_status=True)
+            app.state.llm_http_client = DefaultAsyncHttpxClient(
+                limits=Limits(
+                    max_connections=openai_compatible_provider_config.max_connections,
+                    max_keepalive_connections=openai_compatible_provider_config.max_keepalive_connections,
+                )
+            )
+            searxng_instance_pool = SearxNGInstancePool(
+                searxng_config=searxng_config, http_client=app.state.http_client_session
+            )
+            await searxng_instance_pool.start()
+            app.state.search_tool = SearxNGTool(
+                http_client=app.state.http_client_session,
+                instance_pool=searxng_instance_pool,
+                searxng_config=searxng_config,
+                search_cache=(
+                    TTLCache(
+                        max_entries=searxng_config.cache_max_entries,
+                        ttl_seconds=searxng_config.cache_ttl_seconds,
+                    )
+                    if searxng_config.cache_enabled
+                    else None
+                ),
+            )
+            browser_pool = BrowserPool(
+                crawler_config=crawler_config,
+                browser_config=BrowserConfig(text_mode=True, light_mode=True),
+            )
+            crawl_cache = None
+            if crawler_config.cache_enabled:
+                crawl_cache = CrawlCache(
+                    cache_dir=crawler_config.cache_dir,
+                    ttl_seconds=crawler_config.cache_ttl_seconds,
+                    max_bytes=crawler_config.cache_max_bytes,
+                )
+                await crawl_cache.load()
+            await browser_pool.start()
+            app.state.crawler_tool = WebCrawlerTool(
+                browser_pool=browser_pool,
+                crawl_scheduler=CrawlScheduler(crawler_config=crawler_config),
+                crawl_cache=crawl_cache,
+                http_fetcher=(
+                    HttpFetcher(http_client=app.state.http_client_session, crawler_config=crawler_config)
+                    if crawler_config.http_fast_path_enabled
+                    else None
+                ),
+                url_deadline_seconds=crawler_config.url_deadline_seconds,
+                crawler_config=CrawlerRunConfig(
+                    excluded_tags=EXCLUDED_TAGS,
+                    page_timeout=int(crawler_config.page_timeout_seconds * 1000),
+                ),
+            )
+            app.state.admission_controller = AdmissionController(
+                max_active=server_config.max_active_runs,
+                max_queued=server_config.max_queued_runs,
+                update_interval_seconds=server_config.queue_update_interval_seconds,
+            )
+            blogger_config = BloggerConfig()
+            result_cache = None
+            if blogger_config.result_cache_enabled:
+                result_cache = ResultCache(
+                    blogs=TTLCache(
+                        max_entries=blogger_config.result_cache_blog_max_entries,
+                        ttl_seconds=blogger_config.result_cache_blog_ttl_seconds,
+                    ),
+                    plans=TTLCache(
+                        max_entries=blogger_config.result_cache_plan_max_entries,
+                        ttl_seconds=blogger_config.result_cache_plan_ttl_seconds,
+                    ),
+                    sections=TTLCache(
+                        max_entries=blogger_config.result_cache_section_max_entries,
+                        ttl_seconds=blogger_config.result_cache_section_ttl_seconds,
+                    ),
+                    blogger_config=blogger_config,
+                )
+            llm_cache = LLMCache(
+                response_cache=TTLCache(
+                    max_entries=openai_compatible_provider_config.response_cache_max_entries,
+                    ttl_seconds=openai_compatible_provider_config.response_cache_ttl_seconds,
+                )
+                if openai_compatible_provider_config.response_cache_enabled
+                else None
+            )
+            checkpoint_store = AsyncExitStack()
+            app.state.blogger = Blogger(
+                search_tool=app.state.search_tool,
+                crawler_tool=app.state.crawler_tool,
+                http_async_client=app.state.llm_http_client,
+                result_cache=result_cache,
+                llm_cache=llm_cache,
+                checkpointer=await checkpoint_store.enter_async_context(
+                    open_checkpointer(
+                        backend=server_config.checkpoint_backend,
+                        path=server_config.checkpoint_path,
+                    )
+                ),
+            )
+            app.state.checkpoint_pruner = None
+            if app.state.blogger.checkpointer:
+                app.state.checkpoint_pruner = CheckpointPruner(
+                    checkpointer=app.state.blogger.checkpointer,
+                    ttl_seconds=server_config.checkpoint_ttl_seconds,
+                    interval_seconds=server_config.checkpoint_prune_interval_seconds,
+                    active_thread_ids=app.state.blogger.active_run_ids,
+                )
+                await app.state.checkpoint_pruner.start()
             yield
+            if app.state.checkpoint_pruner:
+                await app.state.checkpoint_pruner.stop()
+            await checkpoint_store.aclose()
+            await searxng_instance_pool.close()
+            await browser_pool.close()
+            await app.state.llm_http_client.aclose()
             await app.state.http_client_session.close()
+            if app.state.watchdog:
+                await app.state.watchdog.stop()
 
         app = FastAPI(lifespan=app_lifespan)
         app.include_router(router=self.ws_api)
-        run(app=app, host=host, port=port)
+        app.include_router(router=self.http_api)
+        run(app=app, host=host, port=port, ws_per_message_deflate=server_config.ws_per_message_deflate)
 
 
 def main():
     parser = ArgumentParser(description="Genesis Mesh Agent Framework")
     parser.add_argument("--host", help="Host address to use", default=DEFAULT_HOST)
     parser.add_argument("--port", help="Port to use", default=DEFAULT_PORT, type=int)
+    parser.add_argument("--debug", help="Log callbacks that block the event loop", action="store_true")
     args = parser.parse_args()
 
     mesh = GenesisMesh()
     mesh.setup()
-    mesh(host=args.host, port=args.port)
+    mesh(host=args.host, port=args.port, debug=args.debug)
 
 
 if __name__ == "__main__":
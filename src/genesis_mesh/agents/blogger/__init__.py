@@ -1,14 +1,225 @@
-from aiohttp import ClientSession
+from asyncio import CancelledError
+from collections import Counter
+from logging import getLogger
+from time import perf_counter
+from uuid import uuid4
+
+from httpx import AsyncClient
+from langgraph.checkpoint.base import BaseCheckpointSaver
 
 from genesis_mesh.agents.blogger.graph.blog_builder import BloggerGraphBuilder
-from genesis_mesh.utils import convert_to_json
+from genesis_mesh.agents.blogger.utils.llm_cache import LLMCache
+from genesis_mesh.agents.blogger.utils.result_cache import ResultCache, dump_update
+from genesis_mesh.agents.blogger.utils.run_stats import RunStats
+from genesis_mesh.agents.blogger.utils.source_registry import SourceRegistry
+from genesis_mesh.agents.blogger.utils.tracing import RunTracer
+from genesis_mesh.agents.blogger.utils.update_encoder import UpdateEncoder
+from genesis_mesh.models import UpdateEncoding
+from genesis_mesh.tools.crawler import WebCrawlerTool
+from genesis_mesh.tools.search_engine import SearxNGTool
+from genesis_mesh.utils.metrics import RUN_DURATION
+
+logger = getLogger()
+
+
+class CheckpointingDisabledError(RuntimeError):
+    def __init__(self):
+        super().__init__("Runs cannot be resumed, checkpointing is disabled")
+
+
+class UnknownRunError(LookupError):
+    def __init__(self, run_id: str):
+        super().__init__(f"No checkpointed run with id {run_id}")
+
+
+class RunInProgressError(RuntimeError):
+    def __init__(self, run_id: str):
+        super().__init__(f"Run {run_id} is already in progress")
 
 
 class Blogger:
-    def __init__(self, http_client: ClientSession):
-        graph_builder = BloggerGraphBuilder(http_client=http_client)
-        self.graph = graph_builder.build()
+    """App-scoped blogger agent, the compiled graph is shared by every session and runs only differ by input"""
+
+    def __init__(
+        self,
+        search_tool: SearxNGTool,
+        crawler_tool: WebCrawlerTool,
+        http_async_client: AsyncClient | None = None,
+        checkpointer: BaseCheckpointSaver | None = None,
+        result_cache: ResultCache | None = None,
+        llm_cache: LLMCache | None = None,
+    ):
+        graph_builder = BloggerGraphBuilder(
+            search_tool=search_tool,
+            crawler_tool=crawler_tool,
+            http_async_client=http_async_client,
+            result_cache=result_cache,
+            llm_cache=llm_cache,
+        )
+        self.result_cache = result_cache
+        self.llm_cache = graph_builder.llm_cache
+        self.graph = graph_builder.build(checkpointer=checkpointer)
+        self.checkpointer = checkpointer
+        self.active_run_ids: set[str] = set()
+        self.runs = 0
+        self.totals: Counter[str] = Counter()
+
+    async def invoke_agent(
+        self,
+        topic: str | None = None,
+        *,
+        run_id: str | None = None,
+        stream_tokens: bool = False,
+        encoding: UpdateEncoding = UpdateEncoding.LEGACY,
+        trace: bool = False,
+        bypass_cache: bool = False,
+    ):
+        """Stream a new run for the topic, or resume the checkpointed run `run_id` from its last finished node.
+
+        Yields the run's messages already encoded as JSON text, followed by the run's trace summary when `trace` is set.
+        A topic that was written before is replayed from the result cache unless `bypass_cache` is set, fresh results
+        are cached either way.
+        """
+
+        resume = run_id is not None
+        if resume and self.checkpointer is None:
+            raise CheckpointingDisabledError
+        run_id = run_id or uuid4().hex
+        if run_id in self.active_run_ids:
+            raise RunInProgressError(run_id)
+
+        # Per-run collaborators travel through the run config, the compiled graph itself is shared
+        source_registry = SourceRegistry()
+        run_stats = RunStats()
+        encoder = UpdateEncoder(encoding=encoding)
+        tracer = RunTracer()
+        config = {
+            "callbacks": [tracer],
+            "configurable": {
+                "thread_id": run_id,
+                "run_id": run_id,
+                "source_registry": source_registry,
+                "run_stats": run_stats,
+                "bypass_cache": bypass_cache,
+            },
+        }
+        started = perf_counter()
+        updates = 0
+        outcome = "failed"
+        self.active_run_ids.add(run_id)
+        try:
+            graph_input: dict | None = {"topic": topic}
+            replay = None
+            if resume:
+                snapshot = await self.graph.aget_state(config)  # type: ignore
+                if not snapshot.values:
+                    raise UnknownRunError(run_id)
+                run_stats.add("resumed_runs")
+                # A None input continues the run from its last checkpoint
+                graph_input = None
+                if not snapshot.next:
+                    # Nothing left to run, replay the finished blog
+                    replay = [{"compile_final_blog": {"final_blog": snapshot.values.get("final_blog", "")}}]
+            elif self.result_cache and not bypass_cache:
+                replay = await self.result_cache.get_blog(topic)  # type: ignore
+                if replay is not None:
+                    run_stats.add("blog_cache_hits")
+
+            if self.checkpointer:
+                # Clients keep the id to resume the run after a dropped connection. A replay from the result cache
+                # checkpoints nothing, so it has no id to resume and the topic is simply requested again
+                cached = replay is not None and not resume
+                yield encoder.message(
+                    {"type": "run", "run_id": None if cached else run_id, "resumed": resume, "cached": cached}
+                )
+
+            if replay is not None:
+                for update in replay:
+                    for message in encoder.update(update):
+                        yield message
+            else:
+                # Top-level updates of a fresh run are recorded for the result cache
+                recorded: list[dict] | None = [] if self.result_cache and not resume else None
+                async for update in self._stream(
+                    graph_input, config, encoder, stream_tokens=stream_tokens, recorded=recorded
+                ):
+                    updates += 1
+                    yield update
+                if recorded:
+                    await self.result_cache.set_blog(topic, recorded)  # type: ignore
+            outcome = "completed"
+            if trace:
+                yield encoder.message(tracer.summary())
+        except (CancelledError, GeneratorExit):
+            # The client went away, all work done so far was for nobody
+            outcome = "abandoned"
+            raise
+        finally:
+            self.active_run_ids.discard(run_id)
+            await source_registry.close()
+            run_stats.add("source_fetches", source_registry.fetches)
+            run_stats.add("saved_source_fetches", source_registry.saved_fetches)
+            RUN_DURATION.labels(outcome).observe(perf_counter() - started)
+            if outcome == "abandoned":
+                run_stats.update(
+                    {
+                        "abandoned_runs": 1,
+                        "abandoned_run_seconds": perf_counter() - started,
+                        "abandoned_updates": updates,
+                        "abandoned_source_fetches": source_registry.fetches,
+                    }
+                )
+            self.runs += 1
+            self.totals.update(run_stats.as_dict())
+            logger.info("Blog run stats: %s", run_stats.as_dict())
+
+    async def _stream(
+        self,
+        graph_input: dict | None,
+        config: dict,
+        encoder: UpdateEncoder,
+        *,
+        stream_tokens: bool,
+        recorded: list[dict] | None = None,
+    ):
+        if not stream_tokens:
+            async for update in self.graph.astream(input=graph_input, config=config, stream_mode="updates"):
+                for message in self._encode_update(update, encoder, recorded):
+                    yield message
+            return
+
+        async for namespace, stream_mode, chunk in self.graph.astream(
+            input=graph_input,
+            config=config,
+            stream_mode=["updates", "messages"],
+            subgraphs=True,
+        ):
+            if stream_mode == "updates":
+                # Subgraph updates are internal to a section, clients keep receiving the top-level updates only
+                if not namespace:
+                    for message in self._encode_update(chunk, encoder, recorded):
+                        yield message
+                continue
+
+            message_chunk, metadata = chunk
+            if "section_name" in metadata and isinstance(message_chunk.content, str) and message_chunk.content:
+                yield encoder.message(
+                    {
+                        "type": "token",
+                        "node": metadata["langgraph_node"],
+                        "section": metadata["section_name"],
+                        "delta": message_chunk.content,
+                    }
+                )
+
+    def _encode_update(self, update: dict, encoder: UpdateEncoder, recorded: list[dict] | None) -> list[str]:
+        # Resumed runs replay their saved writes under "__metadata__", only graph nodes are sent on
+        update = {node: output for node, output in update.items() if not node.startswith("__")}
+        if not update:
+            return []
+        if recorded is not None:
+            recorded.append(dump_update(update))
+        return encoder.update(update)
 
-    async def invoke_agent(self, topic: str):
-        async for update in self.graph.astream(input={"topic": topic}, stream_mode="updates"):
-            yield convert_to_json(update)
+    def stats(self):
+        return {"runs": self.runs, **self.totals}
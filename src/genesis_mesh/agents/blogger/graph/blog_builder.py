@@ -1,6 +1,8 @@
-from aiohttp import ClientSession
+from httpx import AsyncClient
 from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import END, START, StateGraph
 from langgraph.types import Send
 
@@ -14,19 +16,35 @@ from genesis_mesh.agents.blogger.schemas import (
     BlogState,
     BlogStateInput,
     BlogStateOutput,
+    ContentMode,
     Queries,
     Sections,
     SectionState,
 )
 from genesis_mesh.agents.blogger.utils import UtilityFunctions
+from genesis_mesh.agents.blogger.utils.llm_cache import LLMCache
+from genesis_mesh.agents.blogger.utils.result_cache import ResultCache, cache_for
 from genesis_mesh.configs.agents.blogger import BloggerConfig
 from genesis_mesh.configs.llm import OpenAICompatibleAPIConfig
+from genesis_mesh.tools.crawler import WebCrawlerTool
+from genesis_mesh.tools.search_engine import SearxNGTool
+from genesis_mesh.utils.tokens import TokenBudget
 
 
 class BloggerGraphBuilder:
-    def __init__(self, http_client: ClientSession):
+    def __init__(
+        self,
+        search_tool: SearxNGTool,
+        crawler_tool: WebCrawlerTool,
+        http_async_client: AsyncClient | None = None,
+        result_cache: ResultCache | None = None,
+        llm_cache: LLMCache | None = None,
+    ):
         self.blogger_config = BloggerConfig()
+        self.result_cache = result_cache
+        self.llm_cache = llm_cache or LLMCache()
         openai_compatible_provider_config = OpenAICompatibleAPIConfig()
+        # Both LLM clients share one connection pool to the backend
         self.planner_llm = ChatOpenAI(
             model=self.blogger_config.planner_llm,
             temperature=self.blogger_config.planner_llm_temperature,
@@ -34,18 +52,51 @@ class BloggerGraphBuilder:
             base_url=openai_compatible_provider_config.api_base_url,
             seed=40,
             streaming=True,
+            stream_usage=openai_compatible_provider_config.stream_usage,
             n=1,
             max_completion_tokens=self.blogger_config.planner_llm_max_tokens,
+            http_async_client=http_async_client,
+        )
+        self.executor_llm = ChatOpenAI(
+            model=self.blogger_config.executor_llm,
+            temperature=self.blogger_config.executor_llm_temperature,
+            api_key=openai_compatible_provider_config.api_key,
+            base_url=openai_compatible_provider_config.api_base_url,
+            seed=40,
+            streaming=True,
+            stream_usage=openai_compatible_provider_config.stream_usage,
+            n=1,
+            max_completion_tokens=self.blogger_config.executor_llm_max_tokens,
+            http_async_client=http_async_client,
+        )
+        # Every prompt with research context is written by the planner, so its window bounds the context
+        self.token_budget = TokenBudget(
+            model=self.blogger_config.planner_llm,
+            context_window=self.blogger_config.planner_llm_context_window,
+            max_completion_tokens=self.blogger_config.planner_llm_max_tokens,
+        )
+        self.util_functions = UtilityFunctions(
+            search_tool=search_tool, crawler_tool=crawler_tool, token_budget=self.token_budget
+        )
+        self.section_writer_graph_builder = SectionWriterGraphBuilder(
+            blogger_config=self.blogger_config,
+            planner_llm=self.planner_llm,
+            executor_llm=self.executor_llm,
+            util_functions=self.util_functions,
+            token_budget=self.token_budget,
+            result_cache=result_cache,
+            llm_cache=self.llm_cache,
         )
-        self.util_functions = UtilityFunctions(http_client=http_client)
-        self.section_writer_graph_builder = SectionWriterGraphBuilder(http_client=http_client)
 
-    async def generate_blog_plan(self, state: BlogState):
+    async def generate_blog_plan(self, state: BlogState, config: RunnableConfig):
         # Inputs
         topic = state["topic"]
 
-        # Generate search query
-        structured_llm = self.planner_llm.with_structured_output(Queries, method="function_calling", strict=True)
+        # A plan for the same topic spares the planner's searches and LLM calls
+        if (result_cache := cache_for(self.result_cache, config)) and (sections := await result_cache.get_plan(topic)):
+            if run_stats := config["configurable"].get("run_stats"):
+                run_stats.add("plan_cache_hits")
+            return {"sections": sections}
 
         # Format system instructions
         system_instructions_query = blog_planner_query_writer_instructions.format(
@@ -55,17 +106,25 @@ class BloggerGraphBuilder:
         )
 
         # Generate queries
-        results = await structured_llm.ainvoke(
+        results = await self.llm_cache.generate_structured(
+            self.planner_llm,
+            Queries,
             [
                 SystemMessage(content=system_instructions_query),
                 HumanMessage(
                     content="Generate search queries that will help with planning the sections of the blog.",
                 ),
-            ]
+            ],
+            bypass_cache=config["configurable"].get("bypass_cache", False),
         )
 
-        # Search web
-        search_docs = await self.util_functions.search(results.queries)  # type: ignore
+        # Search web, the planner only reads the search summaries
+        search_docs = await self.util_functions.search(
+            results.queries,
+            content_mode=ContentMode.SUMMARIES,
+            deadline_seconds=self.blogger_config.research_deadline_seconds,
+            run_stats=config["configurable"].get("run_stats"),
+        )
 
         # Deduplicate and format sources
         source_str = self.util_functions.deduplicate_and_format_sources(
@@ -73,31 +132,38 @@ class BloggerGraphBuilder:
         )
 
         # Format system instructions
+        context_budget = self.token_budget.context_budget(
+            blog_planner_instructions, topic=topic, blog_organization=self.blogger_config.blog_structure
+        )
         system_instructions_sections = blog_planner_instructions.format(
             topic=topic,
             blog_organization=self.blogger_config.blog_structure,
-            context=source_str,
+            context=self.token_budget.truncate(source_str, context_budget),
         )
 
         # Generate sections
-        structured_llm = self.planner_llm.with_structured_output(Sections, method="function_calling", strict=True)
-        blog_sections = structured_llm.invoke(
+        blog_sections = await self.llm_cache.generate_structured(
+            self.planner_llm,
+            Sections,
             [
                 SystemMessage(content=system_instructions_sections),
                 HumanMessage(
                     content="Generate the sections of the blog. Your response must include a 'sections' field containing a list of sections. Each section must have: name, description, plan, research, and content fields."
                 ),
-            ]
+            ],
+            bypass_cache=config["configurable"].get("bypass_cache", False),
         )
 
-        return {"sections": blog_sections.sections}  # type: ignore
+        if self.result_cache:
+            await self.result_cache.set_plan(topic, blog_sections.sections)
+        return {"sections": blog_sections.sections}
 
     def initiate_section_writing(self, state: BlogState):
         """This is the "map" step when we kick off web research for some sections of the blog"""
 
         return [Send("build_section_with_web_research", {"section": s}) for s in state["sections"] if s.research]
 
-    async def write_final_sections(self, state: SectionState):
+    async def write_final_sections(self, state: SectionState, config: RunnableConfig):
         """Write final sections of the blog, which do not require web search and use the completed sections as context"""
 
         # Get state
@@ -105,14 +171,27 @@ class BloggerGraphBuilder:
         completed_blog_sections = state["blog_sections_from_research"]
 
         # Format system instructions
+        context_budget = self.token_budget.context_budget(
+            final_section_writer_instructions, section_title=section.name, section_topic=section.description
+        )
+        context = self.token_budget.truncate(completed_blog_sections, context_budget)
         system_instructions = final_section_writer_instructions.format(
             section_title=section.name,
             section_topic=section.description,
-            context=completed_blog_sections,
+            context=context,
         )
 
-        # Generate section
-        section_content = await self.planner_llm.ainvoke(
+        # The same section written from the same context before is reused as is
+        if (result_cache := cache_for(self.result_cache, config)) and (
+            content := await result_cache.get_section(final_section_writer_instructions, section, context)
+        ) is not None:
+            if run_stats := config["configurable"].get("run_stats"):
+                run_stats.add("section_cache_hits")
+            section.content = content
+            return {"completed_sections": [section]}
+
+        # Generate section, tagged so streamed tokens can be attributed to it
+        section_content = await self.planner_llm.with_config(metadata={"section_name": section.name}).ainvoke(
             [
                 SystemMessage(content=system_instructions),
                 HumanMessage(content="Generate a blog section based on the provided sources."),
@@ -121,6 +200,8 @@ class BloggerGraphBuilder:
 
         # Write content to section
         section.content = section_content.content  # type: ignore
+        if self.result_cache:
+            await self.result_cache.set_section(final_section_writer_instructions, section, context, section.content)
 
         # Write the updated section to completed sections
         return {"completed_sections": [section]}
@@ -131,8 +212,11 @@ class BloggerGraphBuilder:
         # List of completed sections
         completed_sections = state["completed_sections"]
 
-        # Format completed section to str to use as context for final sections
-        completed_blog_sections = self.util_functions.format_sections(completed_sections)
+        # Format completed section to str to use as context for final sections, sized for the final writer prompt
+        context_budget = self.token_budget.context_budget(
+            final_section_writer_instructions, section_title="", section_topic=""
+        )
+        completed_blog_sections = self.util_functions.format_sections(completed_sections, token_budget=context_budget)
 
         return {"blog_sections_from_research": completed_blog_sections}
 
@@ -168,7 +252,7 @@ class BloggerGraphBuilder:
 
         return {"final_blog": all_sections}
 
-    def build(self):
+    def build(self, checkpointer: BaseCheckpointSaver | None = None):
         # Add nodes and edges
         builder = StateGraph(BlogState, input=BlogStateInput, output=BlogStateOutput)
         builder.add_node("generate_blog_plan", self.generate_blog_plan)
@@ -191,4 +275,4 @@ class BloggerGraphBuilder:
         builder.add_edge("write_final_sections", "compile_final_blog")
         builder.add_edge("compile_final_blog", END)
 
-        return builder.compile()
+        return builder.compile(checkpointer=checkpointer)
@@ -1,5 +1,7 @@
-from aiohttp import ClientSession
+from asyncio import to_thread
+
 from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 from langgraph.graph import END, START, StateGraph
 
@@ -8,50 +10,44 @@ from genesis_mesh.agents.blogger.prompts import (
     section_writer_instructions,
 )
 from genesis_mesh.agents.blogger.schemas import (
+    ContentMode,
     Queries,
+    Section,
     SectionOutputState,
     SectionState,
 )
 from genesis_mesh.agents.blogger.utils import UtilityFunctions
+from genesis_mesh.agents.blogger.utils.llm_cache import LLMCache
+from genesis_mesh.agents.blogger.utils.result_cache import ResultCache, cache_for
 from genesis_mesh.configs.agents.blogger import BloggerConfig
-from genesis_mesh.configs.llm import OpenAICompatibleAPIConfig
+from genesis_mesh.utils.tokens import TokenBudget
 
 
 class SectionWriterGraphBuilder:
-    def __init__(self, http_client: ClientSession):
-        self.blogger_config = BloggerConfig()
-        openai_compatible_provider_config = OpenAICompatibleAPIConfig()
-        self.planner_llm = ChatOpenAI(
-            model=self.blogger_config.planner_llm,
-            temperature=self.blogger_config.planner_llm_temperature,
-            api_key=openai_compatible_provider_config.api_key,
-            base_url=openai_compatible_provider_config.api_base_url,
-            seed=40,
-            streaming=True,
-            n=1,
-            max_completion_tokens=self.blogger_config.planner_llm_max_tokens,
-        )
-        self.executor_llm = ChatOpenAI(
-            model=self.blogger_config.executor_llm,
-            temperature=self.blogger_config.executor_llm_temperature,
-            api_key=openai_compatible_provider_config.api_key,
-            base_url=openai_compatible_provider_config.api_base_url,
-            seed=40,
-            streaming=True,
-            n=1,
-            max_completion_tokens=self.blogger_config.executor_llm_max_tokens,
-        )
-        self.util_functions = UtilityFunctions(http_client=http_client)
-
-    async def generate_queries(self, state: SectionState):
+    def __init__(
+        self,
+        blogger_config: BloggerConfig,
+        planner_llm: ChatOpenAI,
+        executor_llm: ChatOpenAI,
+        util_functions: UtilityFunctions,
+        token_budget: TokenBudget,
+        result_cache: ResultCache | None = None,
+        llm_cache: LLMCache | None = None,
+    ):
+        self.blogger_config = blogger_config
+        self.planner_llm = planner_llm
+        self.executor_llm = executor_llm
+        self.util_functions = util_functions
+        self.token_budget = token_budget
+        self.result_cache = result_cache
+        self.llm_cache = llm_cache or LLMCache()
+
+    async def generate_queries(self, state: SectionState, config: RunnableConfig):
         """Generate search queries for a blog section"""
 
         # Get state
         section = state["section"]
 
-        # Generate queries
-        structured_llm = self.executor_llm.with_structured_output(Queries, method="function_calling", strict=True)
-
         # Format system instructions
         system_instructions = query_writer_instructions.format(
             section_topic=section.description,
@@ -59,47 +55,102 @@ class SectionWriterGraphBuilder:
         )
 
         # Generate queries
-        queries = await structured_llm.ainvoke(
+        queries = await self.llm_cache.generate_structured(
+            self.executor_llm,
+            Queries,
             [
                 SystemMessage(content=system_instructions),
                 HumanMessage(content="Generate search queries on the provided topic."),
-            ]
+            ],
+            bypass_cache=config["configurable"].get("bypass_cache", False),
         )
 
-        return {"search_queries": queries.queries}  # type: ignore
+        return {"search_queries": queries.queries}
 
-    async def search_web(self, state: SectionState):
+    async def search_web(self, state: SectionState, config: RunnableConfig):
         """Search the web for each query, then return a list of raw sources and a formatted string of sources."""
 
         # Get state
+        section = state["section"]
         search_queries = state["search_queries"]
 
         # Web search
-        search_docs = await self.util_functions.search(search_queries)
+        sources_to_crawl = self.blogger_config.sources_to_crawl
+        search_docs = await self.util_functions.search(
+            search_queries,
+            content_mode=ContentMode.TOP_K if sources_to_crawl else ContentMode.FULL,
+            top_k=sources_to_crawl,
+            deadline_seconds=self.blogger_config.research_deadline_seconds,
+            min_sources=self.blogger_config.min_crawled_sources,
+            grace_seconds=self.blogger_config.straggler_grace_seconds,
+            source_registry=config["configurable"].get("source_registry"),
+            run_stats=config["configurable"].get("run_stats"),
+        )
 
-        # Deduplicate and format sources
-        source_str = self.util_functions.deduplicate_and_format_sources(
-            search_docs, max_tokens_per_source=5000, include_raw_content=True
+        # Fingerprinting and ranking read every word of every page, so they run off the event loop
+        source_str, duplicates, duplicate_tokens = await to_thread(
+            self._prepare_sources,
+            search_docs,
+            section=section,
+            query=" ".join([section.description, *(query.search_query for query in search_queries)]),
         )
+        if run_stats := config["configurable"].get("run_stats"):
+            run_stats.add("near_duplicate_sources", duplicates)
+            run_stats.add("near_duplicate_source_tokens", duplicate_tokens)
 
         return {"source_str": source_str}
 
-    async def write_section(self, state: SectionState):
+    def _prepare_sources(self, search_docs: list[dict[str, str]], section: Section, query: str) -> tuple[str, int, int]:
+        """Format the sources of a section, with the number and tokens of the near-duplicate pages left out"""
+
+        # Collapse mirrored and syndicated copies of the same page
+        search_docs, duplicate_docs = self.util_functions.drop_near_duplicate_sources(
+            search_docs,
+            max_distance=self.blogger_config.near_duplicate_max_distance,
+            min_words=self.blogger_config.near_duplicate_min_words,
+        )
+
+        # Keep only the passages relevant to this section, never more than the writer prompt has room for
+        context_budget = self.token_budget.context_budget(
+            section_writer_instructions, section_title=section.name, section_topic=section.description
+        )
+        source_str = self.util_functions.format_relevant_sources(
+            search_docs,
+            query=query,
+            token_budget=min(self.blogger_config.section_context_tokens, context_budget),
+            chunk_tokens=self.blogger_config.chunk_tokens,
+        )
+        return source_str, len(duplicate_docs), sum(self.token_budget.count(doc["content"]) for doc in duplicate_docs)
+
+    async def write_section(self, state: SectionState, config: RunnableConfig):
         """Write a section of the blog"""
 
         # Get state
         section = state["section"]
         source_str = state["source_str"]
 
-        # Format system instructions
+        # Format system instructions, source headers alone can overrun the budget when there are many sources
+        context_budget = self.token_budget.context_budget(
+            section_writer_instructions, section_title=section.name, section_topic=section.description
+        )
+        context = self.token_budget.truncate(source_str, context_budget)
         system_instructions = section_writer_instructions.format(
             section_title=section.name,
             section_topic=section.description,
-            context=source_str,
+            context=context,
         )
 
-        # Generate section
-        section_content = await self.planner_llm.ainvoke(
+        # The same section written from the same sources before is reused as is
+        if (result_cache := cache_for(self.result_cache, config)) and (
+            content := await result_cache.get_section(section_writer_instructions, section, context)
+        ) is not None:
+            if run_stats := config["configurable"].get("run_stats"):
+                run_stats.add("section_cache_hits")
+            section.content = content
+            return {"completed_sections": [section]}
+
+        # Generate section, tagged so streamed tokens can be attributed to it
+        section_content = await self.planner_llm.with_config(metadata={"section_name": section.name}).ainvoke(
             [
                 SystemMessage(content=system_instructions),
                 HumanMessage(content="Generate a blog section based on the provided sources."),
@@ -108,6 +159,8 @@ class SectionWriterGraphBuilder:
 
         # Write content to the section object
         section.content = section_content.content  # type: ignore
+        if self.result_cache:
+            await self.result_cache.set_section(section_writer_instructions, section, context, section.content)
 
         # Write the updated section to completed sections
         return {"completed_sections": [section]}
@@ -1,5 +1,6 @@
+from enum import StrEnum
 from operator import add
-from typing import Annotated, TypedDict
+from typing import Annotated, Literal, TypedDict
 
 from pydantic import BaseModel, Field
 
@@ -21,6 +22,12 @@ class Sections(BaseModel):
     )
 
 
+class ContentMode(StrEnum):
+    SUMMARIES = "summaries"
+    FULL = "full"
+    TOP_K = "top_k"
+
+
 class SearchQuery(BaseModel):
     search_query: str = Field(description="Query for web search.")
 
@@ -31,6 +38,21 @@ class Queries(BaseModel):
     )
 
 
+class BlogStateUpdate(BaseModel):
+    """Fields a graph node may update, the schema typed updates are serialized with"""
+
+    sections: list[Section] | None = None
+    completed_sections: list[Section] | None = None
+    blog_sections_from_research: str | None = None
+    final_blog: str | None = None
+
+
+class StateUpdateMessage(BaseModel):
+    type: Literal["update"] = "update"
+    node: str
+    data: BlogStateUpdate
+
+
 class BlogStateInput(TypedDict):
     topic: str
 
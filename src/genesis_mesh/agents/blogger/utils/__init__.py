@@ -1,17 +1,39 @@
-from asyncio import gather
+from asyncio import FIRST_COMPLETED, Task, create_task, gather, get_running_loop, wait
+from collections import Counter
 from inspect import cleandoc
+from logging import getLogger
 
-from aiohttp import ClientSession
+import numpy as np
 
-from genesis_mesh.agents.blogger.schemas import SearchQuery, Section
+from genesis_mesh.agents.blogger.schemas import ContentMode, SearchQuery, Section
+from genesis_mesh.agents.blogger.utils.fingerprint import hamming_distance, simhash
+from genesis_mesh.agents.blogger.utils.retrieval import bm25_scores, chunk_markdown, tokenize
+from genesis_mesh.agents.blogger.utils.run_stats import RunStats
+from genesis_mesh.agents.blogger.utils.source_registry import SourceRegistry
 from genesis_mesh.tools.crawler import WebCrawlerTool
 from genesis_mesh.tools.search_engine import SearxNGTool
+from genesis_mesh.utils.tokens import TokenBudget
+
+logger = getLogger()
+
+
+def merge_crawled_content(
+    search_results: dict[str, dict[str, str]],
+    crawled_results: dict[str, dict[str, str]],
+) -> list[dict[str, str]]:
+    """Join search results to crawl results on URL, sources without a crawl keep their search summary only"""
+
+    return [
+        {**result, "content": crawled_results[url]["content"]} if url in crawled_results else result
+        for url, result in search_results.items()
+    ]
 
 
 class UtilityFunctions:
-    def __init__(self, http_client: ClientSession):
-        self.search_tool = SearxNGTool(http_client=http_client)
-        self.crawler_tool = WebCrawlerTool()
+    def __init__(self, search_tool: SearxNGTool, crawler_tool: WebCrawlerTool, token_budget: TokenBudget):
+        self.search_tool = search_tool
+        self.crawler_tool = crawler_tool
+        self.token_budget = token_budget
 
     def deduplicate_and_format_sources(
         self,
@@ -25,28 +47,118 @@ class UtilityFunctions:
             if source["url"] not in unique_sources:
                 unique_sources[source["url"]] = source
 
-        formatted_text = "Sources:\n\n"
+        # Collect the pieces and join once, instead of re-copying the growing prompt for every source
+        formatted_parts = ["Sources:\n\n"]
         for source in unique_sources.values():
-            formatted_text += f"Source {source['title']}:\n===\n"
-            formatted_text += f"URL: {source['url']}\n===\n"
-            formatted_text += f"Content summary from source: {source['summary']}\n===\n"
+            formatted_parts.append(
+                f"Source {source['title']}:\n===\n"
+                f"URL: {source['url']}\n===\n"
+                f"Content summary from source: {source['summary']}\n===\n"
+            )
             if include_raw_content:
-                # Using rough estimate of 4 characters per token
-                char_limit = max_tokens_per_source * 4
                 # Handle None content
-                content = source.get("content")
-                if content is None:
-                    content = ""
-                if len(content) > char_limit:
-                    content = content[:char_limit] + "... [truncated]"
-                formatted_text += f"Content from source: {content}\n\n"
+                content = source.get("content") or ""
+                formatted_parts.append("Content from source: ")
+                formatted_parts.append(self.token_budget.truncate(content, max_tokens_per_source))
+                formatted_parts.append("\n\n")
+
+        return "".join(formatted_parts).strip()
+
+    def drop_near_duplicate_sources(
+        self,
+        search_response: list[dict[str, str]],
+        max_distance: int,
+        min_words: int,
+    ) -> tuple[list[dict[str, str]], list[dict[str, str]]]:
+        """Collapse sources whose crawled content is a near duplicate of a higher ranked source.
+
+        Returns the kept and the dropped sources. Content is compared by SimHash, so syndicated articles and mirrored
+        docs are caught even when their URLs differ. Short pages are always kept since their fingerprints are unstable.
+        """
+
+        kept: list[dict[str, str]] = []
+        dropped: list[dict[str, str]] = []
+        fingerprints: list[int] = []
+        for source in search_response:
+            content = source.get("content") or ""
+            if len(tokenize(content)) < min_words:
+                kept.append(source)
+                continue
+            fingerprint = simhash(content)
+            if any(hamming_distance(fingerprint, other) <= max_distance for other in fingerprints):
+                dropped.append(source)
+                continue
+            fingerprints.append(fingerprint)
+            kept.append(source)
+        return kept, dropped
+
+    def format_relevant_sources(
+        self,
+        search_response: list[dict[str, str]],
+        query: str,
+        token_budget: int,
+        chunk_tokens: int,
+    ):
+        """Format sources with only the crawled passages most relevant to the query.
+
+        Crawled pages are chunked on paragraph boundaries, ranked with BM25 against the query and packed best-first
+        into what is left of the token budget once every source header is in. Every source keeps its summary, and
+        excerpts are shown in page order.
+        """
+
+        unique_sources: dict[str, dict[str, str]] = {}
+        for source in search_response:
+            if source["url"] not in unique_sources:
+                unique_sources[source["url"]] = source
+        sources = list(unique_sources.values())
+        source_headers = [
+            f"Source {source['title']}:\n===\n"
+            f"URL: {source['url']}\n===\n"
+            f"Content summary from source: {source['summary']}\n===\n"
+            for source in sources
+        ]
+
+        # Chunks are cut on a rough 4 characters per token, their cost is then measured with the tokenizer
+        chunk_sources: list[int] = []
+        chunks: list[str] = []
+        for source_idx, source in enumerate(sources):
+            for chunk in chunk_markdown(source.get("content") or "", max_chars=chunk_tokens * 4):
+                chunk_sources.append(source_idx)
+                chunks.append(chunk)
+
+        scores = bm25_scores(chunks, query)
+        selected_chunks: set[int] = set()
+        used_tokens = sum(self.token_budget.count(header) for header in source_headers)
+        for chunk_idx in np.argsort(-scores, kind="stable"):
+            if scores[chunk_idx] <= 0:
+                break
+            chunk_cost = self.token_budget.count(chunks[chunk_idx])
+            if used_tokens + chunk_cost > token_budget:
+                continue
+            selected_chunks.add(int(chunk_idx))
+            used_tokens += chunk_cost
+
+        excerpts: dict[int, list[str]] = {}
+        for chunk_idx in sorted(selected_chunks):
+            excerpts.setdefault(chunk_sources[chunk_idx], []).append(chunks[chunk_idx])
 
-        return formatted_text.strip()
+        formatted_parts = ["Sources:\n\n"]
+        for source_idx, source_header in enumerate(source_headers):
+            formatted_parts.append(source_header)
+            if source_idx in excerpts:
+                formatted_parts.append("Relevant excerpts from source:\n")
+                formatted_parts.append("\n...\n".join(excerpts[source_idx]))
+                formatted_parts.append("\n\n")
 
-    def format_sections(self, sections: list[Section]) -> str:
-        formatted_str = ""
+        return "".join(formatted_parts).strip()
+
+    def format_sections(self, sections: list[Section], token_budget: int | None = None) -> str:
+        """Format sections as context for other sections, each section gets an equal share of the token budget"""
+
+        section_budget = token_budget // max(len(sections), 1) if token_budget is not None else None
+        formatted_parts = []
         for idx, section in enumerate(sections, 1):
-            formatted_str += cleandoc(
+            section_header = cleandoc(
                 f"""
                 {"=" * 60}
                 Section {idx}: {section.name}
@@ -57,23 +169,109 @@ class UtilityFunctions:
                 {section.research}
 
                 Content:
-                {section.content if section.content else "[Not yet written]"}
-
                 """
             )
-        return formatted_str
+            content = section.content if section.content else "[Not yet written]"
+            if section_budget is not None:
+                content_budget = section_budget - self.token_budget.count(section_header)
+                content = self.token_budget.truncate(content, max(content_budget, 0))
+            formatted_parts.append(f"{section_header}\n{content}")
+        return "\n\n".join(formatted_parts)
+
+    async def search(
+        self,
+        search_queries: list[SearchQuery],
+        content_mode: ContentMode = ContentMode.FULL,
+        top_k: int = 0,
+        *,
+        deadline_seconds: float | None = None,
+        min_sources: int = 0,
+        grace_seconds: float = 0,
+        source_registry: SourceRegistry | None = None,
+        run_stats: RunStats | None = None,
+    ):
+        """Search and crawl as a pipeline.
+
+        Each URL is crawled as soon as the query that returned it answers. Once `min_sources` pages are in, the
+        remaining crawls get `grace_seconds` to finish, and nothing runs past `deadline_seconds`. Sources that miss
+        either cut-off, or whose crawl came back empty, are returned with their search summary only. With a
+        `source_registry`, URLs already fetched during the run are reused instead of crawled again. Dropped and
+        failed tasks are counted per stage in `run_stats`.
+        """
 
-    async def search(self, search_queries: list[SearchQuery]):
-        search_results: list[dict[str, str]] = []
+        loop = get_running_loop()
+        deadline = loop.time() + deadline_seconds if deadline_seconds else None
+        grace_deadline: float | None = None
+
+        # Search results are deduplicated by URL as they arrive, so each URL is crawled and returned once
+        search_results: dict[str, dict[str, str]] = {}
+        crawled_results: dict[str, dict[str, str]] = {}
+        scheduled_crawls = 0
+        dropped: Counter[str] = Counter()
+        crawl_enabled = content_mode != ContentMode.SUMMARIES
 
         async def get_search_results(query: str):
-            results = await self.search_tool.ainvoke(input={"query": query})
-            search_results.extend(results)
+            return await self.search_tool.ainvoke(input={"query": query})
+
+        async def crawl(url: str) -> dict[str, str]:
+            web_crawler_results = await self.crawler_tool.ainvoke(input={"urls": [url]})
+            return web_crawler_results[0]
+
+        async def get_crawler_result(url: str):
+            if source_registry is None:
+                return url, await crawl(url)
+            return url, await source_registry.fetch(url, lambda: crawl(url))
+
+        pending: dict[Task, str] = {
+            create_task(get_search_results(query.search_query)): "search" for query in search_queries
+        }
+        try:
+            while pending:
+                cut_offs = [cut_off for cut_off in (deadline, grace_deadline) if cut_off is not None]
+                timeout = min(cut_offs) - loop.time() if cut_offs else None
+                if timeout is not None and timeout <= 0:
+                    break
+
+                done, _ = await wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for task in done:
+                    stage = pending.pop(task)
+                    if task.exception() is not None:
+                        logger.warning("Dropping failed %s task: %s", stage, task.exception())
+                        dropped[f"{stage}_failed"] += 1
+                        continue
+
+                    if stage == "crawl":
+                        url, crawler_result = task.result()
+                        if not crawler_result.get("content"):
+                            dropped["crawl_empty"] += 1
+                            continue
+                        crawled_results[url] = crawler_result
+                        if grace_deadline is None and len(crawled_results) >= min_sources > 0:
+                            grace_deadline = loop.time() + grace_seconds
+                        continue
+
+                    for result in task.result():
+                        url = result["url"]
+                        if url in search_results:
+                            continue
+                        search_results[url] = result
+                        # Only the highest ranked unique URLs are crawled, the rest keep their search summary
+                        if not crawl_enabled or (content_mode == ContentMode.TOP_K and scheduled_crawls >= top_k):
+                            continue
+                        scheduled_crawls += 1
+                        pending[create_task(get_crawler_result(url))] = "crawl"
+        finally:
+            for task in pending:
+                task.cancel()
+            await gather(*pending, return_exceptions=True)
 
-        async def enrich_results_with_web_content() -> list[dict[str, str]]:
-            urls = [result["url"] for result in search_results]
-            web_crawler_results: list[dict[str, str]] = await self.crawler_tool.ainvoke(input={"urls": urls})
-            return [{**d1, **d2} for d1 in search_results for d2 in web_crawler_results if d1["url"] == d2["url"]]
+        if pending:
+            logger.info("Dropped %d straggling search/crawl tasks", len(pending))
+            dropped.update(f"{stage}_dropped" for stage in pending.values())
+        if run_stats:
+            run_stats.update(dropped)
 
-        await gather(*[get_search_results(query.search_query) for query in search_queries])
-        return await enrich_results_with_web_content()
+        if not crawl_enabled:
+            # Nothing downstream reads the page content, so skip the crawl entirely
+            return list(search_results.values())
+        return merge_crawled_content(search_results, crawled_results)
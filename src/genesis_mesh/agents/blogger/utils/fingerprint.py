@@ -0,0 +1,27 @@
+from hashlib import blake2b
+
+import numpy as np
+
+from genesis_mesh.agents.blogger.utils.retrieval import tokenize
+
+SIMHASH_BITS = 64
+BIT_POSITIONS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles, texts that share most shingles differ in only a few bits"""
+
+    words = tokenize(text)
+    shingles = {" ".join(words[idx : idx + shingle_size]) for idx in range(max(len(words) - shingle_size + 1, 1))}
+    hashes = np.fromiter(
+        (int.from_bytes(blake2b(shingle.encode(), digest_size=8).digest(), "little") for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    bits = (hashes[:, None] >> BIT_POSITIONS) & np.uint64(1)
+    majority = bits.sum(axis=0) * 2 > len(shingles)
+    return int(np.packbits(majority, bitorder="little").view("<u8")[0])
+
+
+def hamming_distance(left: int, right: int) -> int:
+    return (left ^ right).bit_count()
@@ -0,0 +1,62 @@
+from functools import lru_cache
+from hashlib import blake2b
+from typing import TypeVar
+
+from langchain_core.messages import BaseMessage
+from langchain_openai import ChatOpenAI
+from orjson import dumps
+from pydantic import BaseModel
+
+from genesis_mesh.utils.cache import CacheBackend, SingleFlight
+
+T = TypeVar("T", bound=BaseModel)
+
+
+@lru_cache
+def schema_fingerprint(schema: type[BaseModel]) -> bytes:
+    return dumps(schema.model_json_schema())
+
+
+class LLMCache:
+    """Shares structured LLM calls between runs.
+
+    Identical requests in flight at the same time are sent to the backend once, and their outputs are cached, the
+    fixed seed makes them deterministic enough to reuse. Keys cover the model, temperature, seed, output schema and
+    every message. Free text is never shared: section writers stream their tokens and LLM spans to their own run,
+    which a call joined from another run could not do, and written sections are reused by the result cache instead.
+    """
+
+    def __init__(self, response_cache: CacheBackend | None = None):
+        self.response_cache = response_cache
+        self.single_flight = SingleFlight()
+
+    async def generate_structured(
+        self, llm: ChatOpenAI, schema: type[T], messages: list[BaseMessage], *, bypass_cache: bool = False
+    ) -> T:
+        """Completion of the messages parsed into the schema, served from the cache when it was generated before"""
+
+        key = self.key(llm, messages, schema)
+        if self.response_cache and not bypass_cache and (cached := await self.response_cache.get(key)) is not None:
+            return schema.model_validate(cached)
+
+        async def generate():
+            structured_llm = llm.with_structured_output(schema, method="function_calling", strict=True)
+            result = (await structured_llm.ainvoke(messages)).model_dump(mode="json")  # type: ignore
+            if self.response_cache:
+                await self.response_cache.set(key, result)
+            return result
+
+        # Every caller parses its own copy, nodes go on to modify the models they get
+        return schema.model_validate(await self.single_flight.do(key, generate))
+
+    def key(self, llm: ChatOpenAI, messages: list[BaseMessage], schema: type[BaseModel]) -> str:
+        digest = blake2b(digest_size=16)
+        digest.update(dumps([[message.type, message.content] for message in messages]))
+        digest.update(schema_fingerprint(schema))
+        return f"llm:{llm.model_name}:{llm.temperature}:{llm.seed}:{schema.__name__}:{digest.hexdigest()}"
+
+    def stats(self):
+        return {
+            "response_cache": self.response_cache.stats() if self.response_cache else None,
+            "single_flight": self.single_flight.stats(),
+        }
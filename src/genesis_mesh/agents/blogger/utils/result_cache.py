@@ -0,0 +1,106 @@
+from hashlib import blake2b
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+
+from genesis_mesh.agents.blogger.schemas import BlogStateUpdate, Section
+from genesis_mesh.configs.agents.blogger import BloggerConfig
+from genesis_mesh.utils.cache import CacheBackend
+
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(topic.casefold().split()).rstrip(".!?")
+
+
+def fingerprint(*parts: str) -> str:
+    digest = blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def dump_update(update: dict[str, Any]) -> dict[str, Any]:
+    """JSON form of a graph update as it is kept in the cache"""
+
+    return {
+        node: BlogStateUpdate.model_validate(output or {}).model_dump(mode="json", exclude_unset=True)
+        for node, output in update.items()
+    }
+
+
+def load_update(update: dict[str, Any]) -> dict[str, Any]:
+    """Graph update back from its cached JSON form, with the sections as models again"""
+
+    loaded = {}
+    for node, output in update.items():
+        state_update = BlogStateUpdate.model_validate(output)
+        loaded[node] = {name: getattr(state_update, name) for name in state_update.model_fields_set}
+    return loaded
+
+
+class ResultCache:
+    """Tiered cache of what blog runs produce.
+
+    A finished run is kept as its graph updates and replayed for the same topic, a plan spares the planner's searches
+    and LLM calls, and a section spares its writer's LLM call when the same section meets the same sources again.
+    Keys include a hash of the blogger config, so changing models or prompts settings never serves stale results.
+    """
+
+    def __init__(
+        self,
+        blogs: CacheBackend,
+        plans: CacheBackend,
+        sections: CacheBackend,
+        blogger_config: BloggerConfig,
+    ):
+        self.blogs = blogs
+        self.plans = plans
+        self.sections = sections
+        self.config_hash = fingerprint(
+            blogger_config.model_dump_json(
+                exclude={name for name in BloggerConfig.model_fields if name.startswith("result_cache")}
+            )
+        )
+
+    async def get_blog(self, topic: str) -> list[dict[str, Any]] | None:
+        if (updates := await self.blogs.get(self._key("blog", normalize_topic(topic)))) is None:
+            return None
+        return [load_update(update) for update in updates]
+
+    async def set_blog(self, topic: str, updates: list[dict[str, Any]]):
+        """Keeps a finished run's updates, dumped with `dump_update` as they streamed since later nodes mutate them"""
+
+        await self.blogs.set(self._key("blog", normalize_topic(topic)), updates)
+
+    async def get_plan(self, topic: str) -> list[Section] | None:
+        if (sections := await self.plans.get(self._key("plan", normalize_topic(topic)))) is None:
+            return None
+        return [Section.model_validate(section) for section in sections]
+
+    async def set_plan(self, topic: str, sections: list[Section]):
+        await self.plans.set(
+            self._key("plan", normalize_topic(topic)), [section.model_dump(mode="json") for section in sections]
+        )
+
+    async def get_section(self, instructions: str, section: Section, sources: str) -> str | None:
+        return await self.sections.get(self._section_key(instructions, section, sources))
+
+    async def set_section(self, instructions: str, section: Section, sources: str, content: str):
+        await self.sections.set(self._section_key(instructions, section, sources), content)
+
+    def _section_key(self, instructions: str, section: Section, sources: str) -> str:
+        # The prompt template is part of the key, research and final sections are written from different prompts
+        return self._key("section", instructions, section.name, section.description, fingerprint(sources))
+
+    def _key(self, tier: str, *parts: str) -> str:
+        return f"{tier}:{self.config_hash}:{fingerprint(*parts)}"
+
+    def stats(self):
+        return {"blogs": self.blogs.stats(), "plans": self.plans.stats(), "sections": self.sections.stats()}
+
+
+def cache_for(result_cache: ResultCache | None, config: RunnableConfig) -> ResultCache | None:
+    """Result cache a run looks results up in, None when the run bypasses it"""
+
+    return None if config["configurable"].get("bypass_cache") else result_cache
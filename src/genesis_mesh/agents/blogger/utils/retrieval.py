@@ -0,0 +1,68 @@
+from re import compile as compile_regex
+
+import numpy as np
+
+WORD_PATTERN = compile_regex(r"\w+")
+PARAGRAPH_PATTERN = compile_regex(r"\n\s*\n")
+STOPWORDS = frozenset(
+    """a an and are as at be by for from has have how in is it its of on or that the this to was were what when
+    where which who why will with""".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [word for word in WORD_PATTERN.findall(text.lower()) if len(word) > 1 and word not in STOPWORDS]
+
+
+def chunk_markdown(text: str, max_chars: int) -> list[str]:
+    """Split markdown into chunks of whole paragraphs, hard-splitting only paragraphs longer than a chunk"""
+
+    chunks: list[str] = []
+    current: list[str] = []
+    current_chars = 0
+    for raw_paragraph in PARAGRAPH_PATTERN.split(text):
+        paragraph = raw_paragraph.strip()
+        if not paragraph:
+            continue
+        if current and current_chars + len(paragraph) > max_chars:
+            chunks.append("\n\n".join(current))
+            current, current_chars = [], 0
+        # Only the tail of an oversized paragraph is carried into the next chunk
+        overflow_end = len(paragraph) - (len(paragraph) - 1) % max_chars - 1
+        chunks.extend(paragraph[start : start + max_chars] for start in range(0, overflow_end, max_chars))
+        paragraph = paragraph[overflow_end:]
+        current.append(paragraph)
+        current_chars += len(paragraph)
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def bm25_scores(chunks: list[str], query: str, k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """Okapi BM25 score of every chunk against the query.
+
+    Only query terms can contribute to a score, so the term-frequency matrix is built over the query vocabulary alone
+    with a single bincount, and the scoring itself is one vectorized expression.
+    """
+
+    term_index = {term: idx for idx, term in enumerate(dict.fromkeys(tokenize(query)))}
+    if not chunks or not term_index:
+        return np.zeros(len(chunks))
+
+    num_terms = len(term_index)
+    doc_lengths = np.empty(len(chunks))
+    flat_positions: list[int] = []
+    for chunk_idx, chunk in enumerate(chunks):
+        tokens = tokenize(chunk)
+        doc_lengths[chunk_idx] = len(tokens)
+        offset = chunk_idx * num_terms
+        flat_positions.extend(offset + term_index[token] for token in tokens if token in term_index)
+
+    term_frequencies = np.bincount(
+        np.asarray(flat_positions, dtype=np.int64), minlength=len(chunks) * num_terms
+    ).reshape(len(chunks), num_terms)
+    document_frequencies = np.count_nonzero(term_frequencies, axis=0)
+    idf = np.log1p((len(chunks) - document_frequencies + 0.5) / (document_frequencies + 0.5))
+    length_norm = k1 * (1 - b + b * doc_lengths / max(doc_lengths.mean(), 1.0))
+    saturated = term_frequencies * (k1 + 1) / (term_frequencies + length_norm[:, None])
+    return saturated @ idf
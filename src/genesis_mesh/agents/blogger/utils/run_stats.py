@@ -0,0 +1,19 @@
+from collections import Counter
+from collections.abc import Mapping
+
+
+class RunStats:
+    """Counters collected over one blog run, shared by every node through the run config"""
+
+    def __init__(self):
+        self.counters: Counter[str] = Counter()
+
+    def add(self, name: str, value: float = 1):
+        self.counters[name] += value  # type: ignore
+
+    def update(self, counters: Mapping[str, float]):
+        for name, value in counters.items():
+            self.add(name, value)
+
+    def as_dict(self):
+        return dict(self.counters)
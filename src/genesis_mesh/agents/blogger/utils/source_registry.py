@@ -0,0 +1,36 @@
+from asyncio import Task, create_task, gather, shield
+from collections.abc import Awaitable, Callable
+
+from genesis_mesh.tools.crawler.cache import normalize_url
+
+
+class SourceRegistry:
+    """Per-run registry of crawled sources, so every unique URL is fetched once per blog however many sections cite it"""
+
+    def __init__(self):
+        self._sources: dict[str, Task] = {}
+        self.fetches = 0
+        self.saved_fetches = 0
+
+    async def fetch(self, url: str, crawl: Callable[[], Awaitable[dict[str, str]]]) -> dict[str, str]:
+        key = normalize_url(url)
+        if key in self._sources:
+            self.saved_fetches += 1
+        else:
+            self._sources[key] = create_task(crawl())  # type: ignore
+            self.fetches += 1
+        # A section that gives up on a source must not cancel the fetch for the other sections
+        return await shield(self._sources[key])
+
+    async def close(self):
+        pending = [task for task in self._sources.values() if not task.done()]
+        for task in pending:
+            task.cancel()
+        await gather(*pending, return_exceptions=True)
+
+    def stats(self):
+        return {
+            "unique_sources": len(self._sources),
+            "fetches": self.fetches,
+            "saved_fetches": self.saved_fetches,
+        }
@@ -0,0 +1,170 @@
+from asyncio import CancelledError
+from collections import defaultdict
+from time import perf_counter
+from typing import Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from pydantic import BaseModel
+
+from genesis_mesh.utils.metrics import (
+    LLM_DURATION,
+    LLM_TOKENS,
+    NODE_DURATION,
+    NODE_ERRORS,
+    NODE_OUTPUT_BYTES,
+    TOOL_DURATION,
+    TOOL_ERRORS,
+    TOOL_OUTPUT_BYTES,
+)
+
+TOP_LEVEL_GRAPH = "blogger"
+
+
+def text_bytes(obj: Any) -> int:
+    """UTF-8 size of the text held in a state update or tool result"""
+
+    if isinstance(obj, str):
+        return len(obj.encode())
+    if isinstance(obj, dict):
+        return sum(text_bytes(value) for value in obj.values())
+    if isinstance(obj, list | tuple):
+        return sum(text_bytes(item) for item in obj)
+    if isinstance(obj, BaseModel):
+        return text_bytes(vars(obj))
+    return 0
+
+
+def llm_usage(response: LLMResult) -> tuple[int, int]:
+    for generations in response.generations:
+        for generation in generations:
+            if usage := getattr(getattr(generation, "message", None), "usage_metadata", None):
+                return usage["input_tokens"], usage["output_tokens"]
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+
+
+class SpanTotals:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.counters: defaultdict[str, int] = defaultdict(int)
+
+    def record(self, seconds: float, **counters: int):
+        self.calls += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        for name, value in counters.items():
+            self.counters[name] += value
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "seconds": self.seconds,
+            "max_seconds": self.max_seconds,
+            **self.counters,
+        }
+
+
+class RunTracer(BaseCallbackHandler):
+    """Times every graph node, tool call and LLM call of one blog run.
+
+    Each span is exported to the Prometheus metrics as it ends and added to the run's totals, which make up the trace
+    summary. Sections are told apart by the `section_name` metadata their LLM calls carry.
+    """
+
+    # Plain bookkeeping, not worth a hop to the executor
+    run_inline = True
+
+    def __init__(self):
+        self.started = perf_counter()
+        self._spans: dict[Any, tuple[str, tuple[str, ...], float]] = {}
+        self.nodes: defaultdict[str, SpanTotals] = defaultdict(SpanTotals)
+        self.tools: defaultdict[str, SpanTotals] = defaultdict(SpanTotals)
+        self.llm: defaultdict[str, SpanTotals] = defaultdict(SpanTotals)
+        self.sections: defaultdict[str, defaultdict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def on_chain_start(self, _serialized, _inputs, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node")
+        # Only the node itself, not the runnables it calls, carries the node's name. Entry points like __start__ only
+        # pass the input on and are left out
+        if node is None or node.startswith("__") or kwargs.get("name") != node:
+            return
+        # Nodes of a subgraph are namespaced under the node that runs the subgraph
+        parent_namespace = metadata.get("langgraph_checkpoint_ns", "").split("|")[:-1]
+        graph = parent_namespace[-1].split(":")[0] if parent_namespace else TOP_LEVEL_GRAPH
+        self._spans[run_id] = ("node", (graph, node), perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **_kwargs):
+        if (span := self._spans.pop(run_id, None)) is None:
+            return
+        _, labels, started = span
+        seconds = perf_counter() - started
+        output_bytes = text_bytes(outputs)
+        NODE_DURATION.labels(*labels).observe(seconds)
+        NODE_OUTPUT_BYTES.labels(*labels).inc(output_bytes)
+        self.nodes["/".join(labels)].record(seconds, output_bytes=output_bytes)
+
+    def on_chain_error(self, error, *, run_id, **_kwargs):
+        if (span := self._spans.pop(run_id, None)) is None or isinstance(error, CancelledError):
+            return
+        _, labels, _ = span
+        NODE_ERRORS.labels(*labels).inc()
+        self.nodes["/".join(labels)].errors += 1
+
+    def on_tool_start(self, serialized, _input_str, *, run_id, **kwargs):
+        self._spans[run_id] = ("tool", (kwargs.get("name") or serialized.get("name", "unknown"),), perf_counter())
+
+    def on_tool_end(self, output, *, run_id, **_kwargs):
+        if (span := self._spans.pop(run_id, None)) is None:
+            return
+        _, labels, started = span
+        seconds = perf_counter() - started
+        output_bytes = text_bytes(output)
+        TOOL_DURATION.labels(*labels).observe(seconds)
+        TOOL_OUTPUT_BYTES.labels(*labels).inc(output_bytes)
+        self.tools[labels[0]].record(seconds, output_bytes=output_bytes)
+
+    def on_tool_error(self, error, *, run_id, **_kwargs):
+        if (span := self._spans.pop(run_id, None)) is None or isinstance(error, CancelledError):
+            return
+        TOOL_ERRORS.labels(*span[1]).inc()
+        self.tools[span[1][0]].errors += 1
+
+    def on_chat_model_start(self, _serialized, _messages, *, run_id, metadata=None, **_kwargs):
+        metadata = metadata or {}
+        labels = (metadata.get("langgraph_node", "unknown"), metadata.get("ls_model_name", "unknown"))
+        self._spans[run_id] = ("llm", (*labels, metadata.get("section_name", "")), perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **_kwargs):
+        if (span := self._spans.pop(run_id, None)) is None:
+            return
+        _, (node, model, section), started = span
+        seconds = perf_counter() - started
+        prompt_tokens, completion_tokens = llm_usage(response)
+        LLM_DURATION.labels(node, model).observe(seconds)
+        LLM_TOKENS.labels(node, model, "prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(node, model, "completion").inc(completion_tokens)
+        self.llm[f"{node}/{model}"].record(seconds, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        if section:
+            self.sections[section]["prompt_tokens"] += prompt_tokens
+            self.sections[section]["completion_tokens"] += completion_tokens
+
+    def on_llm_error(self, error, *, run_id, **_kwargs):
+        if (span := self._spans.pop(run_id, None)) is None or isinstance(error, CancelledError):
+            return
+        self.llm[f"{span[1][0]}/{span[1][1]}"].errors += 1
+
+    def summary(self):
+        return {
+            "type": "trace",
+            "run_seconds": perf_counter() - self.started,
+            "nodes": {name: totals.as_dict() for name, totals in self.nodes.items()},
+            "tools": {name: totals.as_dict() for name, totals in self.tools.items()},
+            "llm": {name: totals.as_dict() for name, totals in self.llm.items()},
+            "sections": {name: dict(tokens) for name, tokens in self.sections.items()},
+        }
@@ -0,0 +1,75 @@
+from typing import Any
+
+from orjson import dumps
+
+from genesis_mesh.agents.blogger.schemas import BlogStateUpdate, Section, StateUpdateMessage
+from genesis_mesh.models import UpdateEncoding
+from genesis_mesh.utils import convert_to_json
+
+
+class UpdateEncoder:
+    """Encodes the messages of one run for the wire.
+
+    Delta encoding remembers which sections the client already received, so every run needs its own encoder.
+    """
+
+    def __init__(self, encoding: UpdateEncoding = UpdateEncoding.LEGACY):
+        self.encoding = encoding
+        self.section_names: list[str] | None = None
+        self.sent_sections: set[str] = set()
+
+    def message(self, message: dict[str, Any]) -> str:
+        return dumps(message).decode()
+
+    def update(self, update: dict[str, Any]) -> list[str]:
+        """Encodes a graph update, which holds the output of one or more nodes"""
+
+        if self.encoding == UpdateEncoding.TYPED:
+            return [
+                StateUpdateMessage.model_construct(
+                    type="update", node=node, data=BlogStateUpdate.model_construct(**(output or {}))
+                ).model_dump_json(exclude_unset=True)
+                for node, output in update.items()
+            ]
+        if self.encoding == UpdateEncoding.DELTA:
+            return [message for node, output in update.items() for message in self._delta(node, output or {})]
+        return [self.message(convert_to_json(update))]  # type: ignore
+
+    def _delta(self, node: str, output: dict[str, Any]) -> list[str]:
+        messages = []
+        if "sections" in output:
+            # The plan carries no content yet, names and descriptions are all the client needs
+            self.section_names = [section.name for section in output["sections"]]
+            messages.append(
+                self.message(
+                    {
+                        "type": "plan",
+                        "node": node,
+                        "sections": [
+                            section.model_dump(mode="json", exclude={"content"}) for section in output["sections"]
+                        ],
+                    }
+                )
+            )
+        messages.extend(self._section(node, section) for section in output.get("completed_sections") or [])
+        if "final_blog" in output:
+            # The final blog only joins sections the client already has, unless some were sent before a resume
+            complete = self.section_names is not None and self.sent_sections.issuperset(self.section_names)
+            messages.append(
+                self.message(
+                    {
+                        "type": "final",
+                        "node": node,
+                        "section_order": self.section_names if complete else None,
+                        "final_blog": None if complete else output["final_blog"],
+                    }
+                )
+            )
+        if not messages:
+            # Research context and other internal state stays on the server, the client just sees the progress
+            messages.append(self.message({"type": "progress", "node": node}))
+        return messages
+
+    def _section(self, node: str, section: Section) -> str:
+        self.sent_sections.add(section.name)
+        return self.message({"type": "section", "node": node, "name": section.name, "content": section.content})
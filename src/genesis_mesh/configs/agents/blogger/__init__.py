@@ -24,9 +24,25 @@ class BloggerConfig(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="blogger_", case_sensitive=False)
     blog_structure: str = Field(default=DEFAULT_BLOG_STRUCTURE, min_length=1, max_length=500)
     number_of_queries: int = Field(default=2, le=3, ge=1)
+    sources_to_crawl: int = Field(default=0, ge=0, le=50)
+    research_deadline_seconds: float = Field(default=90, gt=0)
+    min_crawled_sources: int = Field(default=4, ge=0)
+    straggler_grace_seconds: float = Field(default=5, ge=0)
+    section_context_tokens: int = Field(default=6000, ge=256, le=131072)
+    chunk_tokens: int = Field(default=256, ge=32, le=4096)
+    near_duplicate_max_distance: int = Field(default=6, ge=0, le=32)
+    near_duplicate_min_words: int = Field(default=50, ge=1)
     planner_llm: str = Field(default="marco-o1", min_length=1, max_length=100)
     planner_llm_max_tokens: int = Field(default=8192, ge=256, le=32768)
+    planner_llm_context_window: int = Field(default=32768, ge=1024, le=1048576)
     planner_llm_temperature: float = Field(default=0.5, ge=0, le=1)
     executor_llm: str = Field(default="marco-o1", min_length=1, max_length=100)
     executor_llm_max_tokens: int = Field(default=8192, ge=256, le=32768)
     executor_llm_temperature: float = Field(default=0.3, ge=0, le=1)
+    result_cache_enabled: bool = Field(default=True)
+    result_cache_blog_max_entries: int = Field(default=256, ge=1)
+    result_cache_blog_ttl_seconds: int = Field(default=21600, ge=0)
+    result_cache_plan_max_entries: int = Field(default=1024, ge=1)
+    result_cache_plan_ttl_seconds: int = Field(default=86400, ge=0)
+    result_cache_section_max_entries: int = Field(default=4096, ge=1)
+    result_cache_section_ttl_seconds: int = Field(default=86400, ge=0)
@@ -7,3 +7,11 @@ class OpenAICompatibleAPIConfig(BaseSettings):
     llm_name: str = Field(default="marco-o1", min_length=1, max_length=100)
     api_base_url: str = Field(default="http://localhost:8080", min_length=1, max_length=100)
     api_key: SecretStr = Field(default=SecretStr("dummy"))
+    max_connections: int = Field(default=100, ge=1)
+    max_keepalive_connections: int = Field(default=20, ge=0)
+    # Asks for token usage at the end of every stream, turn off for providers that reject stream_options
+    stream_usage: bool = Field(default=True)
+    # Structured outputs (plans, search queries) are cached per model, temperature, seed and prompt
+    response_cache_enabled: bool = Field(default=True)
+    response_cache_max_entries: int = Field(default=2048, ge=1)
+    response_cache_ttl_seconds: int = Field(default=3600, ge=0)
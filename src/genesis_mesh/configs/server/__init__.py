@@ -0,0 +1,21 @@
+from typing import Literal
+
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class ServerConfig(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="genesis_mesh_", case_sensitive=False)
+    debug: bool = Field(default=False)
+    loop_block_threshold_ms: int = Field(default=100, ge=1)
+    loop_watchdog_interval_ms: int = Field(default=20, ge=1)
+    max_active_runs: int = Field(default=4, ge=1)
+    max_queued_runs: int = Field(default=32, ge=0)
+    queue_update_interval_seconds: float = Field(default=5, gt=0)
+    checkpoint_backend: Literal["sqlite", "memory", "none"] = Field(default="sqlite")
+    checkpoint_path: str = Field(default=".cache/checkpoints.sqlite", min_length=1)
+    # Runs whose last checkpoint is older than this are deleted, resuming them is no longer possible
+    checkpoint_ttl_seconds: float = Field(default=21600, gt=0)
+    checkpoint_prune_interval_seconds: float = Field(default=600, gt=0)
+    # Lets clients negotiate permessage-deflate, which shrinks the markdown heavy updates considerably
+    ws_per_message_deflate: bool = Field(default=True)
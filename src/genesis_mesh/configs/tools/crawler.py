@@ -0,0 +1,26 @@
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class CrawlerConfig(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="crawler_", case_sensitive=False)
+    # 0 launches the first browser when a page first needs one instead of at startup
+    browser_pool_size: int = Field(default=2, ge=0, le=16)
+    max_concurrent_pages: int = Field(default=8, ge=1, le=128)
+    max_pages_per_browser: int = Field(default=200, ge=1)
+    cache_enabled: bool = Field(default=True)
+    cache_dir: str = Field(default=".cache/crawler", min_length=1)
+    cache_ttl_seconds: int = Field(default=86400, ge=0)
+    cache_max_bytes: int = Field(default=512 * 1024 * 1024, ge=0)
+    http_fast_path_enabled: bool = Field(default=True)
+    http_timeout_seconds: float = Field(default=10, gt=0)
+    http_max_bytes: int = Field(default=2 * 1024 * 1024, ge=1024)
+    http_min_words: int = Field(default=150, ge=0)
+    max_concurrent_fetches: int = Field(default=16, ge=1, le=512)
+    max_concurrent_fetches_per_host: int = Field(default=2, ge=1, le=64)
+    per_host_requests_per_second: float = Field(default=2, gt=0)
+    per_host_burst: int = Field(default=4, ge=1)
+    backoff_base_seconds: float = Field(default=1, gt=0)
+    backoff_max_seconds: float = Field(default=60, gt=0)
+    page_timeout_seconds: float = Field(default=30, gt=0)
+    url_deadline_seconds: float = Field(default=45, gt=0)
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -5,6 +7,27 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class SearxNGConfig(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="searxng_", case_sensitive=False)
     base_url: str = Field(default="http://localhost:8080", min_length=1, max_length=100)
+    # Takes precedence over base_url when set, e.g. SEARXNG_BASE_URLS='["http://a:8080", "http://b:8080"]'
+    base_urls: list[str] = Field(default=[])
+    balancing: Literal["least_outstanding", "latency_weighted"] = Field(default="least_outstanding")
+    health_path: str = Field(default="/healthz", min_length=1, max_length=100)
+    health_check_interval_seconds: float = Field(default=10, ge=0)
+    circuit_failure_threshold: int = Field(default=3, ge=1)
+    circuit_open_seconds: float = Field(default=30, gt=0)
     search_path: str = Field(default="/search", min_length=1, max_length=100)
     engines: list[str] = Field(default=["google"])
+    language: str = Field(default="en", min_length=1, max_length=10)
     min_score: float = Field(default=0.4, gt=0, le=1)
+    cache_enabled: bool = Field(default=True)
+    cache_ttl_seconds: int = Field(default=900, ge=0)
+    cache_max_entries: int = Field(default=4096, ge=1)
+    request_timeout_seconds: float = Field(default=10, gt=0)
+    hedge_enabled: bool = Field(default=True)
+    hedge_engines: list[str] = Field(default=["duckduckgo"])
+    hedge_after_seconds: float = Field(default=2, gt=0)
+    hedge_percentile: float = Field(default=95, gt=0, lt=100)
+    hedge_min_samples: int = Field(default=20, ge=1)
+
+    @property
+    def instance_urls(self) -> list[str]:
+        return self.base_urls or [self.base_url]
@@ -1,5 +1,32 @@
-from pydantic import BaseModel, Field
+from enum import StrEnum
+
+from pydantic import BaseModel, Field, model_validator
+
+
+class UpdateEncoding(StrEnum):
+    # Every update as a list of single-key dicts, the original wire format
+    LEGACY = "legacy"
+    # Every update as {"type": "update", "node": ..., "data": {...}}
+    TYPED = "typed"
+    # Only what the client has not seen yet, sections are sent once and the final blog is assembled by the client
+    DELTA = "delta"
 
 
 class BloggerRequest(BaseModel):
-    topic: str = Field(min_length=5, max_length=500)
+    topic: str | None = Field(default=None, min_length=5, max_length=500)
+    # Resumes a checkpointed run instead of starting a new one
+    run_id: str | None = Field(default=None, min_length=1, max_length=64)
+    stream_tokens: bool = Field(default=False)
+    priority: int = Field(default=0, ge=0, le=9)
+    encoding: UpdateEncoding = Field(default=UpdateEncoding.LEGACY)
+    # Ends the run with a summary of where its time and tokens went
+    trace: bool = Field(default=False)
+    # Skips the result cache lookups, the fresh results still refresh the cache
+    bypass_cache: bool = Field(default=False)
+
+    @model_validator(mode="after")
+    def check_topic_or_run_id(self):
+        if self.topic is None and self.run_id is None:
+            msg = "Either a topic or the run_id of a run to resume is required"
+            raise ValueError(msg)
+        return self
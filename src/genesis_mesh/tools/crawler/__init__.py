@@ -1,32 +1,91 @@
-from asyncio import Semaphore, gather
+from asyncio import gather, timeout
+from collections import Counter
+from logging import getLogger
 from typing import Any
 
-from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig  # type: ignore
+from crawl4ai import CrawlerRunConfig  # type: ignore
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import BaseTool
+from pydantic import Field
 
 from genesis_mesh.models.tools.crawler import WebCrawlerInputSchema
+from genesis_mesh.tools.crawler.browser_pool import BrowserPool, is_browser_crash
+from genesis_mesh.tools.crawler.cache import CrawlCache
+from genesis_mesh.tools.crawler.http_fetcher import HttpFetcher
+from genesis_mesh.tools.crawler.scheduler import CrawlScheduler
+
+logger = getLogger()
+
+EXCLUDED_TAGS = ["header", "footer", "nav"]
 
 
 class WebCrawlerTool(BaseTool):
     name: str = "Web Crawler"
     description: str = "Use this tool to extract the content from a list of URLs."
     args_schema: Any = WebCrawlerInputSchema
-    max_concurrency: int = 4
-    browser_config: BrowserConfig = BrowserConfig(text_mode=True, light_mode=True)
+    browser_pool: BrowserPool
+    crawl_scheduler: CrawlScheduler
+    crawl_cache: CrawlCache | None = None
+    http_fetcher: HttpFetcher | None = None
+    tiers: Counter = Field(default_factory=Counter)
+    escalations: Counter = Field(default_factory=Counter)
+    url_deadline_seconds: float | None = None
     crawler_config: CrawlerRunConfig = CrawlerRunConfig(
-        excluded_tags=["header", "footer", "nav"],
+        excluded_tags=EXCLUDED_TAGS,
     )
 
     def _run(self, *args, **kwargs):
         raise NotImplementedError
 
-    async def _arun(self, urls: list[str]):
-        semaphore = Semaphore(value=self.max_concurrency)
-        async with AsyncWebCrawler(config=self.browser_config) as crawler:
+    async def _arun(self, urls: list[str], config: RunnableConfig):
+        # Runs share the scheduler fairly, each run is its own queue
+        session = config.get("configurable", {}).get("run_id", "default")
+
+        async def fetch(url):
+            if self.crawl_cache and (cached_result := self.crawl_cache.get(url)):
+                self.tiers["cache"] += 1
+                return cached_result
+
+            # Static pages are served by a plain GET, the browser only renders what that cannot
+            if self.http_fetcher:
+                async with self.crawl_scheduler.slot(url, session=session) as slot:
+                    content, escalation_reason = await self.http_fetcher.fetch(url, slot=slot)
+                if content is not None:
+                    crawler_result = {"content": content, "url": url, "tier": "http"}
+                    self.tiers["http"] += 1
+                    logger.debug("Fetched %s over HTTP", url)
+                    if self.crawl_cache:
+                        await self.crawl_cache.put(url, crawler_result)
+                    return crawler_result
+                self.escalations[escalation_reason] += 1
+                logger.debug("Escalating %s to the browser: %s", url, escalation_reason)
+
+            async with self.crawl_scheduler.slot(url, session=session) as slot, self.browser_pool.lease() as lease:
+                result = await lease.crawler.arun(url=url, config=self.crawler_config)
+                slot.report(result.status_code)
+                if not result.success and is_browser_crash(result.error_message):
+                    lease.mark_crashed()
+
+            crawler_result = {"content": result.markdown, "url": result.url, "tier": "browser"}
+            self.tiers["browser"] += 1
+            if self.crawl_cache and result.success and result.markdown:
+                await self.crawl_cache.put(url, crawler_result)
+            return crawler_result
+
+        async def get_crawler_result(url):
+            # A page that misses its deadline comes back empty instead of holding up the other URLs
+            try:
+                async with timeout(self.url_deadline_seconds):
+                    return await fetch(url)
+            except TimeoutError:
+                self.tiers["timeout"] += 1
+                logger.info("Crawl of %s missed its %ss deadline", url, self.url_deadline_seconds)
+                return {"content": None, "url": url, "tier": "timeout"}
 
-            async def get_crawler_result(url):
-                async with semaphore:
-                    result = await crawler.arun(url=url, config=self.crawler_config)
-                    return {"content": result.markdown, "url": result.url}
+        return await gather(*[get_crawler_result(url) for url in urls])
 
-            return await gather(*[get_crawler_result(url) for url in urls])
+    def stats(self):
+        return {
+            "tiers": dict(self.tiers),
+            "escalations": dict(self.escalations),
+        }
@@ -0,0 +1,187 @@
+from asyncio import Lock, Semaphore, Task, create_task, gather
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from logging import getLogger
+from time import perf_counter
+
+from crawl4ai import AsyncWebCrawler, BrowserConfig  # type: ignore
+
+from genesis_mesh.configs.tools.crawler import CrawlerConfig
+
+logger = getLogger()
+
+BROWSER_CRASH_MARKERS = (
+    "Target page, context or browser has been closed",
+    "Browser has been closed",
+    "Browser closed",
+    "Connection closed",
+)
+
+
+def is_browser_crash(error_message: str | None) -> bool:
+    if not error_message:
+        return False
+    return any(marker in error_message for marker in BROWSER_CRASH_MARKERS)
+
+
+class BrowserPoolNotStartedError(RuntimeError):
+    pass
+
+
+class PooledBrowser:
+    def __init__(self, browser_config: BrowserConfig):
+        self.crawler = AsyncWebCrawler(config=browser_config)
+        self.pages_served = 0
+        self.active_pages = 0
+        self.retired = False
+
+    async def start(self):
+        await self.crawler.start()
+
+    async def close(self):
+        try:
+            await self.crawler.close()
+        except Exception:
+            logger.exception(msg="Failed to close pooled browser")
+
+
+class BrowserLease:
+    def __init__(self, browser: PooledBrowser):
+        self.browser = browser
+        self.crashed = False
+
+    @property
+    def crawler(self) -> AsyncWebCrawler:
+        return self.browser.crawler
+
+    def mark_crashed(self):
+        self.crashed = True
+
+
+class BrowserPool:
+    """App-scoped pool of long-lived headless browsers shared by every crawl"""
+
+    def __init__(self, crawler_config: CrawlerConfig, browser_config: BrowserConfig):
+        self.crawler_config = crawler_config
+        self.browser_config = browser_config
+        self._browsers: list[PooledBrowser] = []
+        self._page_slots = Semaphore(value=crawler_config.max_concurrent_pages)
+        self._lock = Lock()
+        self._started = False
+        self._replacements: set[Task] = set()
+        self._in_use = 0
+        self._waiting = 0
+        self._leases = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._recycled = 0
+        self._crashes = 0
+
+    async def start(self):
+        async with self._lock:
+            if self._started:
+                return
+            self._browsers = [await self._launch_browser() for _ in range(self.crawler_config.browser_pool_size)]
+            self._started = True
+
+    async def close(self):
+        async with self._lock:
+            browsers, self._browsers = self._browsers, []
+            self._started = False
+        await gather(*[browser.close() for browser in browsers])
+
+    async def _launch_browser(self) -> PooledBrowser:
+        browser = PooledBrowser(self.browser_config)
+        await browser.start()
+        return browser
+
+    async def _checkout(self) -> PooledBrowser:
+        async with self._lock:
+            if not self._started:
+                raise BrowserPoolNotStartedError
+            if not self._browsers:
+                self._browsers.append(await self._launch_browser())
+            browser = min(self._browsers, key=lambda b: b.active_pages)
+            browser.active_pages += 1
+            browser.pages_served += 1
+            self._in_use += 1
+            if browser.pages_served >= self.crawler_config.max_pages_per_browser:
+                self._retire(browser)
+            return browser
+
+    def _retire(self, browser: PooledBrowser):
+        # Take the browser out of rotation straight away and replace it in the background so that new
+        # leases never wait on a launch. The old instance is closed once its last page is released.
+        if browser.retired:
+            return
+        browser.retired = True
+        self._recycled += 1
+        self._browsers.remove(browser)
+        task = create_task(self._replace_browser())
+        self._replacements.add(task)
+        task.add_done_callback(self._replacements.discard)
+
+    async def _replace_browser(self):
+        try:
+            browser = await self._launch_browser()
+        except Exception:
+            logger.exception(msg="Failed to launch replacement browser")
+            return
+        async with self._lock:
+            if self._started and len(self._browsers) < self.crawler_config.browser_pool_size:
+                self._browsers.append(browser)
+                return
+        await browser.close()
+
+    async def _checkin(self, lease: BrowserLease):
+        browser = lease.browser
+        async with self._lock:
+            browser.active_pages -= 1
+            self._in_use -= 1
+            if lease.crashed:
+                self._crashes += 1
+                self._retire(browser)
+            drained = browser.retired and browser.active_pages == 0
+        if drained:
+            await browser.close()
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[BrowserLease]:
+        wait_started = perf_counter()
+        self._waiting += 1
+        try:
+            await self._page_slots.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            waited = perf_counter() - wait_started
+            self._leases += 1
+            self._total_wait_seconds += waited
+            self._max_wait_seconds = max(self._max_wait_seconds, waited)
+
+            browser = await self._checkout()
+            lease = BrowserLease(browser)
+            try:
+                yield lease
+            except Exception:
+                lease.mark_crashed()
+                raise
+            finally:
+                await self._checkin(lease)
+        finally:
+            self._page_slots.release()
+
+    def stats(self):
+        capacity = self.crawler_config.max_concurrent_pages
+        return {
+            "browsers": len(self._browsers),
+            "capacity": capacity,
+            "in_use": self._in_use,
+            "occupancy": self._in_use / capacity,
+            "waiting": self._waiting,
+            "leases": self._leases,
+            "avg_wait_seconds": self._total_wait_seconds / self._leases if self._leases else 0.0,
+            "max_wait_seconds": self._max_wait_seconds,
+            "recycled": self._recycled,
+            "crashes": self._crashes,
+        }
@@ -0,0 +1,163 @@
+from asyncio import to_thread
+from collections import OrderedDict
+from hashlib import sha256
+from json import dumps, loads
+from logging import getLogger
+from mmap import ACCESS_READ, mmap
+from os import replace
+from pathlib import Path
+from struct import Struct
+from struct import error as struct_error
+from time import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from uuid import uuid4
+from zlib import compress, decompress
+from zlib import error as zlib_error
+
+logger = getLogger()
+
+# Every entry starts with its absolute expiry time so that TTLs survive restarts
+ENTRY_HEADER = Struct("<d")
+ENTRY_SUFFIX = ".zmd"
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAM_PREFIXES = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+        )
+    )
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class CrawlCache:
+    """Disk-backed cache of crawled markdown keyed by the digest of the normalized URL"""
+
+    def __init__(self, cache_dir: str | Path, ttl_seconds: int, max_bytes: int, compression_level: int = 6):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        # digest -> (size on disk, expiry timestamp), ordered from least to most recently used
+        self._index: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+        self._bytes_served = 0
+
+    async def load(self):
+        await to_thread(self._scan)
+
+    def _scan(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in self.cache_dir.glob(f"*/*{ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+                with path.open("rb") as f:
+                    (expires_at,) = ENTRY_HEADER.unpack(f.read(ENTRY_HEADER.size))
+            except (OSError, ValueError, struct_error):
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size, expires_at))
+
+        # Without access times on disk, the write order is the best approximation of recency
+        for _, digest, size, expires_at in sorted(entries):
+            self._index[digest] = (size, expires_at)
+            self._bytes += size
+        self._evict()
+
+    def _digest(self, url: str) -> str:
+        return sha256(normalize_url(url).encode()).hexdigest()
+
+    def _path(self, digest: str) -> Path:
+        return self.cache_dir / digest[:2] / f"{digest}{ENTRY_SUFFIX}"
+
+    def get(self, url: str) -> dict[str, str] | None:
+        digest = self._digest(url)
+        entry = self._index.get(digest)
+        if entry is None:
+            self._misses += 1
+            return None
+
+        size, expires_at = entry
+        if expires_at <= time():
+            self._expired += 1
+            self._misses += 1
+            self._remove(digest)
+            return None
+
+        try:
+            with self._path(digest).open("rb") as f, mmap(f.fileno(), 0, access=ACCESS_READ) as mm:
+                value = loads(decompress(mm[ENTRY_HEADER.size :]))
+        except (OSError, ValueError, zlib_error):
+            logger.exception(msg="Dropping unreadable crawl cache entry")
+            self._misses += 1
+            self._remove(digest)
+            return None
+
+        self._index.move_to_end(digest)
+        self._hits += 1
+        self._bytes_served += size
+        return value
+
+    async def put(self, url: str, value: dict[str, str], ttl_seconds: int | None = None):
+        digest = self._digest(url)
+        expires_at = time() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        payload = ENTRY_HEADER.pack(expires_at) + compress(dumps(value).encode(), self.compression_level)
+        try:
+            await to_thread(self._write, digest, payload)
+        except OSError:
+            logger.exception(msg="Failed to write crawl cache entry")
+            return
+
+        previous = self._index.pop(digest, None)
+        if previous is not None:
+            self._bytes -= previous[0]
+        self._index[digest] = (len(payload), expires_at)
+        self._bytes += len(payload)
+        self._evict()
+
+    def _write(self, digest: str, payload: bytes):
+        path = self._path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{digest}.{uuid4().hex}.tmp")
+        tmp_path.write_bytes(payload)
+        replace(tmp_path, path)
+
+    def _remove(self, digest: str):
+        entry = self._index.pop(digest, None)
+        if entry is not None:
+            self._bytes -= entry[0]
+        self._path(digest).unlink(missing_ok=True)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._index:
+            digest = next(iter(self._index))
+            self._remove(digest)
+            self._evictions += 1
+
+    def stats(self):
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._index),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": self._hits / lookups if lookups else 0.0,
+            "expired": self._expired,
+            "evictions": self._evictions,
+            "bytes_served": self._bytes_served,
+        }
@@ -0,0 +1,167 @@
+from asyncio import to_thread
+from html.parser import HTMLParser
+from logging import getLogger
+from re import compile as compile_regex
+
+from aiohttp import ClientError, ClientSession, ClientTimeout
+
+from genesis_mesh.configs.tools.crawler import CrawlerConfig
+from genesis_mesh.tools.crawler.scheduler import CrawlSlot
+
+logger = getLogger()
+
+WHITESPACE_PATTERN = compile_regex(r"\s+")
+# Same exclusions as the browser crawl, plus everything that never renders as text
+SKIPPED_TAGS = frozenset(
+    {"script", "style", "noscript", "template", "svg", "iframe", "head", "header", "footer", "nav", "form"}
+)
+VOID_TAGS = frozenset({"br", "hr", "img", "input", "meta", "link", "area", "base", "col", "embed", "source", "wbr"})
+BLOCK_TAGS = frozenset(
+    {"p", "div", "section", "article", "main", "aside", "table", "tr", "ul", "ol", "dl", "dt", "dd", "figure"}
+)
+HEADING_LEVELS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+# Mount points of client-side rendered apps
+APP_ROOT_IDS = frozenset({"root", "app", "__next", "__nuxt", "svelte", "ember-app"})
+HTML_CONTENT_TYPES = frozenset({"text/html", "application/xhtml+xml"})
+
+
+class MarkdownExtractor(HTMLParser):
+    """Incremental HTML to markdown conversion that also collects the signals of a JS-rendered page"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: list[str] = []
+        self._inline: list[str] = []
+        self._prefix = ""
+        self._skip_depth = 0
+        self._pre_depth = 0
+        self._in_script = False
+        self._in_noscript = False
+        self.script_chars = 0
+        self.text_chars = 0
+        self.has_app_root = False
+        self.noscript_requires_js = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if tag == "br" and not self._skip_depth:
+                self._inline.append("\n")
+            return
+        if tag == "div" and any(name == "id" and value in APP_ROOT_IDS for name, value in attrs):
+            self.has_app_root = True
+        if tag == "script":
+            self._in_script = True
+        elif tag == "noscript":
+            self._in_noscript = True
+        if tag in SKIPPED_TAGS or self._skip_depth:
+            self._skip_depth += 1
+            return
+
+        if tag in HEADING_LEVELS:
+            self._flush()
+            self._prefix = "#" * HEADING_LEVELS[tag] + " "
+        elif tag == "li":
+            self._flush()
+            self._prefix = "- "
+        elif tag == "blockquote":
+            self._flush()
+            self._prefix = "> "
+        elif tag == "pre":
+            self._flush()
+            self._pre_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if tag == "script":
+            self._in_script = False
+        elif tag == "noscript":
+            self._in_noscript = False
+        if self._skip_depth:
+            self._skip_depth -= 1
+            return
+
+        if tag == "pre" and self._pre_depth:
+            self._pre_depth -= 1
+            code = "".join(self._inline).strip("\n")
+            self._inline = []
+            if code.strip():
+                self.blocks.append(f"```\n{code}\n```")
+        elif tag in HEADING_LEVELS or tag in BLOCK_TAGS or tag in {"li", "blockquote"}:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._in_script:
+            self.script_chars += len(data)
+        elif self._in_noscript and "javascript" in data.lower():
+            self.noscript_requires_js = True
+        if self._skip_depth:
+            return
+        self._inline.append(data if self._pre_depth else WHITESPACE_PATTERN.sub(" ", data))
+
+    def _flush(self):
+        if self._pre_depth:
+            return
+        text = "".join(self._inline).strip()
+        self._inline = []
+        if text:
+            self.blocks.append(self._prefix + text)
+            self.text_chars += len(text)
+        self._prefix = ""
+
+    def markdown(self) -> str:
+        self._flush()
+        return "\n\n".join(self.blocks)
+
+
+def extract_markdown(body: bytes, charset: str) -> MarkdownExtractor:
+    extractor = MarkdownExtractor()
+    extractor.feed(body.decode(charset, errors="replace"))
+    extractor.close()
+    return extractor
+
+
+class HttpFetcher:
+    """Fetches pages with a plain HTTP GET and reports when a page needs a browser instead"""
+
+    def __init__(self, http_client: ClientSession, crawler_config: CrawlerConfig):
+        self.http_client = http_client
+        self.crawler_config = crawler_config
+        self.timeout = ClientTimeout(total=crawler_config.http_timeout_seconds)
+
+    async def fetch(self, url: str, slot: CrawlSlot | None = None) -> tuple[str | None, str | None]:
+        """Returns the page as markdown, or None with the reason the page has to be escalated to the browser"""
+
+        try:
+            async with self.http_client.get(
+                url, timeout=self.timeout, allow_redirects=True, raise_for_status=False
+            ) as response:
+                if slot:
+                    slot.report(response.status, response.headers.get("Retry-After"))
+                if response.status != 200:  # noqa: PLR2004
+                    return None, f"status_{response.status}"
+                if response.content_type not in HTML_CONTENT_TYPES:
+                    return None, "content_type"
+
+                chunks = []
+                received_bytes = 0
+                async for chunk in response.content.iter_chunked(65536):
+                    chunks.append(chunk)
+                    received_bytes += len(chunk)
+                    if received_bytes >= self.crawler_config.http_max_bytes:
+                        break
+            # HTMLParser is pure Python and takes hundreds of milliseconds on a large page, so it runs off the loop
+            extractor = await to_thread(extract_markdown, b"".join(chunks), response.charset or "utf-8")
+        except (ClientError, TimeoutError, LookupError) as e:
+            logger.debug("HTTP fetch of %s failed: %s", url, e)
+            return None, "error"
+
+        markdown = extractor.markdown()
+        requires_js = extractor.has_app_root or extractor.noscript_requires_js
+        if requires_js and extractor.script_chars > extractor.text_chars:
+            return None, "js_rendered"
+        if len(markdown.split()) < self.crawler_config.http_min_words:
+            return None, "thin"
+        return markdown, None
@@ -0,0 +1,227 @@
+from asyncio import CancelledError, Future, TimerHandle, get_running_loop
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from time import monotonic
+from urllib.parse import urlsplit
+
+from genesis_mesh.configs.tools.crawler import CrawlerConfig
+
+THROTTLING_STATUSES = frozenset({429, 503})
+HOST_SWEEP_INTERVAL = 256
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    # Only the delay-seconds form, an HTTP date falls back to the computed backoff
+    if value is None or not value.strip().isdigit():
+        return None
+    return float(value)
+
+
+class HostState:
+    """Token bucket, concurrency and backoff bookkeeping for one host"""
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+        self.active = 0
+        self.backoff_seconds = 0.0
+        self.backoff_until = 0.0
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_at(self, now: float) -> float:
+        """Earliest time a request to this host may start, ignoring its concurrency limit"""
+
+        self.refill(now)
+        token_ready_at = now if self.tokens >= 1 else now + (1 - self.tokens) / self.rate
+        return max(token_ready_at, self.backoff_until)
+
+
+class CrawlWaiter:
+    def __init__(self, host: str, future: Future):
+        self.host = host
+        self.future = future
+        self.enqueued_at = monotonic()
+
+
+class CrawlSlot:
+    def __init__(self, scheduler: "CrawlScheduler", host: str):
+        self.scheduler = scheduler
+        self.host = host
+
+    def report(self, status_code: int | None, retry_after: str | None = None):
+        """Feed the response status back so throttled hosts are backed off"""
+
+        self.scheduler.report(self.host, status_code, retry_after)
+
+
+class CrawlScheduler:
+    """Process-wide admission for outbound page fetches.
+
+    Fetches are admitted under a global and a per-host concurrency limit, and each host is rate limited with a token
+    bucket. A host answering 429/503 is paused for Retry-After or an exponentially growing backoff. Waiting fetches
+    are queued per session and sessions are served round-robin, so one large run cannot starve the others.
+    """
+
+    def __init__(self, crawler_config: CrawlerConfig):
+        self.crawler_config = crawler_config
+        self._sessions: OrderedDict[str, deque[CrawlWaiter]] = OrderedDict()
+        self._hosts: dict[str, HostState] = {}
+        self._active = 0
+        self._timer: TimerHandle | None = None
+        self._granted = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._throttled = 0
+        self._releases = 0
+
+    @asynccontextmanager
+    async def slot(self, url: str, session: str = "default") -> AsyncIterator[CrawlSlot]:
+        host = urlsplit(url).hostname or ""
+        waiter = CrawlWaiter(host, get_running_loop().create_future())
+        self._sessions.setdefault(session, deque()).append(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the caller went away
+                self._release(host)
+            else:
+                self._forget(session, waiter)
+            raise
+
+        try:
+            yield CrawlSlot(self, host)
+        finally:
+            self._release(host)
+
+    def report(self, host: str, status_code: int | None, retry_after: str | None = None):
+        host_state = self._hosts.get(host)
+        if host_state is None or status_code is None:
+            return
+        if status_code not in THROTTLING_STATUSES:
+            host_state.backoff_seconds = 0.0
+            return
+
+        self._throttled += 1
+        host_state.backoff_seconds = min(
+            max(host_state.backoff_seconds * 2, self.crawler_config.backoff_base_seconds),
+            self.crawler_config.backoff_max_seconds,
+        )
+        delay = parse_retry_after(retry_after)
+        delay = host_state.backoff_seconds if delay is None else min(delay, self.crawler_config.backoff_max_seconds)
+        host_state.backoff_until = max(host_state.backoff_until, monotonic() + delay)
+
+    def _host(self, host: str, now: float) -> HostState:
+        if host not in self._hosts:
+            self._hosts[host] = HostState(
+                rate=self.crawler_config.per_host_requests_per_second,
+                burst=self.crawler_config.per_host_burst,
+                now=now,
+            )
+        return self._hosts[host]
+
+    def _dispatch(self):
+        now = monotonic()
+        next_wakeup: float | None = None
+        while self._active < self.crawler_config.max_concurrent_fetches:
+            admitted = False
+            for session, queue in self._sessions.items():
+                for waiter in queue:
+                    host_state = self._host(waiter.host, now)
+                    if host_state.active >= self.crawler_config.max_concurrent_fetches_per_host:
+                        continue
+                    ready_at = host_state.ready_at(now)
+                    if ready_at > now:
+                        next_wakeup = ready_at if next_wakeup is None else min(next_wakeup, ready_at)
+                        continue
+                    self._admit(session, waiter, host_state, now)
+                    admitted = True
+                    break
+                if admitted:
+                    # The session goes to the back of the line once served
+                    self._sessions.move_to_end(session)
+                    break
+            if not admitted:
+                break
+
+        for session in [session for session, queue in self._sessions.items() if not queue]:
+            del self._sessions[session]
+        if next_wakeup is not None:
+            self._schedule_wakeup(next_wakeup)
+
+    def _admit(self, session: str, waiter: CrawlWaiter, host_state: HostState, now: float):
+        self._sessions[session].remove(waiter)
+        host_state.tokens -= 1
+        host_state.active += 1
+        self._active += 1
+        wait_seconds = now - waiter.enqueued_at
+        self._granted += 1
+        self._total_wait_seconds += wait_seconds
+        self._max_wait_seconds = max(self._max_wait_seconds, wait_seconds)
+        waiter.future.set_result(None)
+
+    def _schedule_wakeup(self, when: float):
+        loop = get_running_loop()
+        # The timer runs on the loop clock, the scheduler on monotonic()
+        loop_when = loop.time() + max(when - monotonic(), 0)
+        if self._timer is not None and not self._timer.cancelled():
+            if self._timer.when() <= loop_when:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_at(loop_when, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def _release(self, host: str):
+        self._active -= 1
+        self._hosts[host].active -= 1
+        self._releases += 1
+        if self._releases % HOST_SWEEP_INTERVAL == 0:
+            self._sweep_hosts()
+        self._dispatch()
+
+    def _sweep_hosts(self):
+        # An idle, healthy host with a full bucket carries no state worth keeping
+        now = monotonic()
+        for host in [
+            host
+            for host, host_state in self._hosts.items()
+            if host_state.active == 0
+            and host_state.backoff_seconds == 0
+            and host_state.ready_at(now) <= now
+            and host_state.tokens >= host_state.burst
+        ]:
+            del self._hosts[host]
+
+    def _forget(self, session: str, waiter: CrawlWaiter):
+        queue = self._sessions.get(session)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._sessions[session]
+
+    def stats(self):
+        now = monotonic()
+        queued = [waiter for queue in self._sessions.values() for waiter in queue]
+        return {
+            "active": self._active,
+            "capacity": self.crawler_config.max_concurrent_fetches,
+            "queued": len(queued),
+            "queued_sessions": len(self._sessions),
+            "oldest_wait_seconds": max((now - waiter.enqueued_at for waiter in queued), default=0.0),
+            "tracked_hosts": len(self._hosts),
+            "hosts_backing_off": sum(host_state.backoff_until > now for host_state in self._hosts.values()),
+            "granted": self._granted,
+            "avg_wait_seconds": self._total_wait_seconds / self._granted if self._granted else 0.0,
+            "max_wait_seconds": self._max_wait_seconds,
+            "throttled_responses": self._throttled,
+        }
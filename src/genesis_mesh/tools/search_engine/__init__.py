@@ -1,10 +1,23 @@
+from asyncio import FIRST_COMPLETED, create_task, wait
+from collections import Counter, deque
+from time import perf_counter
 from typing import Any
 
-from aiohttp import ClientSession
+import numpy as np
+from aiohttp import ClientSession, ClientTimeout
 from langchain_core.tools import BaseTool
+from pydantic import Field
 
 from genesis_mesh.configs.tools.searxng import SearxNGConfig
 from genesis_mesh.models.tools.search_engine import SearxNGInputSchema, SearxNGResponse
+from genesis_mesh.tools.search_engine.instances import SearxNGInstance, SearxNGInstancePool
+from genesis_mesh.utils.cache import CacheBackend, SingleFlight
+
+LATENCY_WINDOW = 512
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split())
 
 
 class SearxNGTool(BaseTool):
@@ -15,28 +28,122 @@ class SearxNGTool(BaseTool):
     args_schema: Any = SearxNGInputSchema
     searxng_config: SearxNGConfig = SearxNGConfig()
     http_client: ClientSession
+    instance_pool: SearxNGInstancePool
+    search_cache: CacheBackend | None = None
+    single_flight: SingleFlight = Field(default_factory=SingleFlight)
+    latencies: deque = Field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    hedging: Counter = Field(default_factory=Counter)
 
     def _run(self, *args, **kwargs):
         raise NotImplementedError
 
+    def cache_key(self, query: str):
+        engines = ",".join(sorted(self.searxng_config.engines))
+        return f"searxng:{self.searxng_config.language}:{engines}:{normalize_query(query)}"
+
     async def _arun(self, query: str):
+        cache_key = self.cache_key(query)
+        if self.search_cache and (cached_results := await self.search_cache.get(cache_key)) is not None:
+            return cached_results
+
+        async def search():
+            results = await self._search(query)
+            if self.search_cache:
+                await self.search_cache.set(cache_key, results)
+            return results
+
+        # Concurrent identical queries share a single upstream request
+        return await self.single_flight.do(cache_key, search)
+
+    def hedge_delay(self) -> float:
+        """How long the first request gets before a duplicate is sent, the observed tail latency once known"""
+
+        if len(self.latencies) < self.searxng_config.hedge_min_samples:
+            return self.searxng_config.hedge_after_seconds
+        return float(np.percentile(self.latencies, self.searxng_config.hedge_percentile))
+
+    async def _search(self, query: str):
+        if not self.searxng_config.hedge_enabled:
+            return await self._query(query, self.searxng_config.engines, record_latency=True)
+
+        picked: list[SearxNGInstance] = []
+        requests = {
+            create_task(self._query(query, self.searxng_config.engines, picked=picked, record_latency=True)): "primary"
+        }
+        hedged = False
+        errors: list[BaseException] = []
+        try:
+            while requests:
+                done, _ = await wait(
+                    requests, timeout=None if hedged else self.hedge_delay(), return_when=FIRST_COMPLETED
+                )
+                for request in done:
+                    kind = requests.pop(request)
+                    if (error := request.exception()) is not None:
+                        errors.append(error)
+                        continue
+                    if kind == "hedge":
+                        self.hedging["hedge_wins"] += 1
+                    return request.result()
+
+                if not hedged:
+                    # The first request failed or is in the slow tail, race it against a duplicate on another
+                    # instance, or on other engines when there is only one instance
+                    hedged = True
+                    self.hedging["failed_over" if errors else "hedged"] += 1
+                    if len(self.instance_pool.instances) > 1:
+                        hedge = self._query(query, self.searxng_config.engines, exclude=picked[0] if picked else None)
+                    else:
+                        hedge = self._query(query, self.searxng_config.hedge_engines)
+                    requests[create_task(hedge)] = "hedge"
+            raise errors[0]
+        finally:
+            for request in requests:
+                request.cancel()
+
+    async def _query(
+        self,
+        query: str,
+        engines: list[str],
+        *,
+        exclude: SearxNGInstance | None = None,
+        picked: list[SearxNGInstance] | None = None,
+        record_latency: bool = False,
+    ):
         req_params = {
             "q": query,
-            "engines": self.searxng_config.engines,
-            "language": "en",
+            "engines": engines,
+            "language": self.searxng_config.language,
             "format": "json",
         }
-        async with self.http_client.get(
-            f"{self.searxng_config.base_url}{self.searxng_config.search_path}",
-            params=req_params,
-        ) as response:
-            search_response: SearxNGResponse = await response.json()
-            return [
-                {
-                    "url": result["url"],
-                    "title": result["title"],
-                    "summary": result["content"],
-                }
-                for result in search_response["results"]
-                if result["score"] >= self.searxng_config.min_score
-            ]
+        started = perf_counter()
+        async with self.instance_pool.acquire(exclude=exclude) as instance:
+            if picked is not None:
+                picked.append(instance)
+            async with self.http_client.get(
+                f"{instance.base_url}{self.searxng_config.search_path}",
+                params=req_params,
+                timeout=ClientTimeout(total=self.searxng_config.request_timeout_seconds),
+            ) as response:
+                search_response: SearxNGResponse = await response.json()
+                if record_latency:
+                    self.latencies.append(perf_counter() - started)
+                return [
+                    {
+                        "url": result["url"],
+                        "title": result["title"],
+                        "summary": result["content"],
+                    }
+                    for result in search_response["results"]
+                    if result["score"] >= self.searxng_config.min_score
+                ]
+
+    def stats(self):
+        return {
+            "hedge_delay_seconds": self.hedge_delay(),
+            "latency_samples": len(self.latencies),
+            "hedged": self.hedging["hedged"],
+            "hedge_wins": self.hedging["hedge_wins"],
+            "failed_over": self.hedging["failed_over"],
+            "instances": self.instance_pool.stats(),
+        }
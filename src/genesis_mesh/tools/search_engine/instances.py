@@ -0,0 +1,169 @@
+from asyncio import CancelledError, Task, create_task, gather, sleep
+from bisect import bisect_left
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from enum import StrEnum
+from logging import getLogger
+from random import choices
+from time import monotonic, perf_counter
+
+from aiohttp import ClientError, ClientSession, ClientTimeout
+
+from genesis_mesh.configs.tools.searxng import SearxNGConfig
+
+logger = getLogger()
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Weight given to the newest sample in the moving latency average
+LATENCY_EWMA_ALPHA = 0.2
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class NoSearxNGInstanceError(RuntimeError):
+    pass
+
+
+class SearxNGInstance:
+    def __init__(self, base_url: str, initial_latency: float):
+        self.base_url = base_url
+        self.outstanding = 0
+        self.latency = initial_latency
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.state = CircuitState.CLOSED
+        self.opened_at = 0.0
+
+    def observe(self, latency: float):
+        self.latency += LATENCY_EWMA_ALPHA * (latency - self.latency)
+        self.histogram[bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_ewma_seconds": self.latency,
+            "latency_histogram": {
+                f"le_{bound}": count for bound, count in zip((*LATENCY_BUCKETS, "inf"), self.histogram, strict=True)
+            },
+        }
+
+
+class SearxNGInstancePool:
+    """Balances searches over SearxNG instances.
+
+    Instances are picked by fewest outstanding requests or at random weighted by inverse latency. Consecutive
+    failures open an instance's circuit, which is half-opened for a single trial request after a cool-down or as soon
+    as a background health probe succeeds.
+    """
+
+    def __init__(self, searxng_config: SearxNGConfig, http_client: ClientSession):
+        self.searxng_config = searxng_config
+        self.http_client = http_client
+        self.instances = [
+            SearxNGInstance(base_url=base_url, initial_latency=searxng_config.hedge_after_seconds / 2)
+            for base_url in searxng_config.instance_urls
+        ]
+        self._health_checks: Task | None = None
+
+    async def start(self):
+        if self.searxng_config.health_check_interval_seconds > 0:
+            self._health_checks = create_task(self._run_health_checks())
+
+    async def close(self):
+        if self._health_checks:
+            self._health_checks.cancel()
+            with suppress(CancelledError):
+                await self._health_checks
+
+    @asynccontextmanager
+    async def acquire(self, exclude: SearxNGInstance | None = None) -> AsyncIterator[SearxNGInstance]:
+        instance = self.pick(exclude=exclude)
+        instance.outstanding += 1
+        instance.requests += 1
+        started = perf_counter()
+        try:
+            yield instance
+        except Exception:
+            self.record_failure(instance)
+            raise
+        else:
+            instance.observe(perf_counter() - started)
+            self.record_success(instance)
+        finally:
+            instance.outstanding -= 1
+
+    def pick(self, exclude: SearxNGInstance | None = None) -> SearxNGInstance:
+        candidates = [
+            instance for instance in self.instances if instance is not exclude and self._is_available(instance)
+        ]
+        if not candidates:
+            # Every circuit is open, failing open on the instance that has rested longest beats failing every search
+            candidates = sorted(
+                (instance for instance in self.instances if instance is not exclude),
+                key=lambda instance: instance.opened_at,
+            )[:1]
+        if not candidates:
+            raise NoSearxNGInstanceError
+
+        if self.searxng_config.balancing == "latency_weighted":
+            weights = [1 / (max(instance.latency, 1e-3) * (instance.outstanding + 1)) for instance in candidates]
+            return choices(candidates, weights=weights)[0]  # noqa: S311
+        return min(candidates, key=lambda instance: (instance.outstanding, instance.latency))
+
+    def _is_available(self, instance: SearxNGInstance) -> bool:
+        if instance.state == CircuitState.OPEN:
+            if monotonic() - instance.opened_at < self.searxng_config.circuit_open_seconds:
+                return False
+            instance.state = CircuitState.HALF_OPEN
+        # A half-open instance only takes one trial request at a time
+        return instance.state == CircuitState.CLOSED or instance.outstanding == 0
+
+    def record_success(self, instance: SearxNGInstance):
+        instance.consecutive_failures = 0
+        if instance.state != CircuitState.CLOSED:
+            logger.info("SearxNG instance %s recovered", instance.base_url)
+            instance.state = CircuitState.CLOSED
+
+    def record_failure(self, instance: SearxNGInstance):
+        instance.failures += 1
+        instance.consecutive_failures += 1
+        if instance.state == CircuitState.HALF_OPEN or (
+            instance.consecutive_failures >= self.searxng_config.circuit_failure_threshold
+        ):
+            if instance.state != CircuitState.OPEN:
+                logger.warning("Ejecting SearxNG instance %s", instance.base_url)
+            instance.state = CircuitState.OPEN
+            instance.opened_at = monotonic()
+
+    async def _run_health_checks(self):
+        while True:
+            await gather(*[self._probe(instance) for instance in self.instances])
+            await sleep(self.searxng_config.health_check_interval_seconds)
+
+    async def _probe(self, instance: SearxNGInstance):
+        try:
+            async with self.http_client.get(
+                f"{instance.base_url}{self.searxng_config.health_path}",
+                timeout=ClientTimeout(total=self.searxng_config.request_timeout_seconds),
+                raise_for_status=True,
+            ):
+                pass
+        except (ClientError, TimeoutError):
+            logger.debug("Health probe of SearxNG instance %s failed", instance.base_url)
+            self.record_failure(instance)
+            return
+        if instance.state == CircuitState.OPEN:
+            # Let real traffic confirm the recovery with a trial request
+            instance.state = CircuitState.HALF_OPEN
+
+    def stats(self):
+        return {instance.base_url: instance.stats() for instance in self.instances}
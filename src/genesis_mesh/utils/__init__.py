@@ -8,6 +8,10 @@ from pydantic import BaseModel, ValidationError
 logger = getLogger()
 
 
+# First characters of a string json.loads can parse, anything else is text and is not worth an attempt
+JSON_START_CHARS = frozenset('{["-0123456789tfnNI')
+
+
 def convert_to_json(obj: Any):
     if isinstance(obj, dict):
         return [{k: convert_to_json(v)} for k, v in obj.items()]
@@ -16,6 +20,8 @@ def convert_to_json(obj: Any):
     if isinstance(obj, BaseModel):
         return obj.model_dump(mode="json")
     if isinstance(obj, str):
+        if obj.lstrip()[:1] not in JSON_START_CHARS:
+            return obj
         try:
             return convert_to_json(loads(obj))
         except JSONDecodeError:
@@ -23,6 +29,13 @@ def convert_to_json(obj: Any):
     return obj
 
 
+async def wait_for_disconnect(ws: WebSocket):
+    """Returns once the client goes away, anything else it sends in the meantime is ignored"""
+
+    while (message := await ws.receive())["type"] != "websocket.disconnect":
+        logger.debug("Ignoring client message during a run: %s", message["type"])
+
+
 async def build_request(ws: WebSocket, request_type: type[BaseModel]):
     try:
         json_request = await ws.receive_json()
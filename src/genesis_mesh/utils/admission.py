@@ -0,0 +1,121 @@
+from asyncio import Future, get_running_loop, wait
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from heapq import heapify, heappop, heappush
+from itertools import count
+from math import ceil
+from time import monotonic
+
+# Weight given to the newest run in the moving average used for ETAs
+RUN_SECONDS_EWMA_ALPHA = 0.2
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+class AdmissionController:
+    """Caps the number of concurrently active runs, further runs wait in a bounded priority queue.
+
+    Higher priorities are admitted first and equal priorities in arrival order. Queued callers are told their position
+    and an ETA when they enter the queue and then every `update_interval_seconds`. A run that does not fit in the
+    queue is rejected immediately with `QueueFullError`.
+    """
+
+    def __init__(self, max_active: int, max_queued: int, update_interval_seconds: float):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.update_interval_seconds = update_interval_seconds
+        self._queue: list[tuple[int, int, Future]] = []
+        self._sequence = count()
+        self._active = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._abandoned_in_queue = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._run_seconds: float | None = None
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: int = 0,
+        notify: Callable[[int, float | None], Awaitable[None]] | None = None,
+    ) -> AsyncIterator[None]:
+        enqueued_at = monotonic()
+        if self._active < self.max_active and not self._queue:
+            self._active += 1
+        else:
+            if len(self._queue) >= self.max_queued:
+                self._rejected += 1
+                raise QueueFullError
+            await self._wait_in_queue(priority, notify)
+
+        wait_seconds = monotonic() - enqueued_at
+        self._admitted += 1
+        self._total_wait_seconds += wait_seconds
+        self._max_wait_seconds = max(self._max_wait_seconds, wait_seconds)
+
+        started_at = monotonic()
+        try:
+            yield
+        finally:
+            run_seconds = monotonic() - started_at
+            self._run_seconds = (
+                run_seconds
+                if self._run_seconds is None
+                else self._run_seconds + RUN_SECONDS_EWMA_ALPHA * (run_seconds - self._run_seconds)
+            )
+            self._release()
+
+    async def _wait_in_queue(self, priority: int, notify: Callable[[int, float | None], Awaitable[None]] | None):
+        future = get_running_loop().create_future()
+        entry = (-priority, next(self._sequence), future)
+        heappush(self._queue, entry)
+        try:
+            while not future.done():
+                if notify:
+                    position = self.position(entry)
+                    await notify(position, self.eta_seconds(position))
+                await wait({future}, timeout=self.update_interval_seconds)
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as the caller went away, pass it on
+                self._release()
+            elif entry in self._queue:
+                self._queue.remove(entry)
+                heapify(self._queue)
+            self._abandoned_in_queue += 1
+            raise
+
+    def _release(self):
+        # The slot goes straight to the next waiter, so the active count only drops when nobody is queued
+        while self._queue:
+            _, _, future = heappop(self._queue)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def position(self, entry: tuple[int, int, Future]) -> int:
+        return sum(other < entry for other in self._queue) + 1
+
+    def eta_seconds(self, position: int) -> float | None:
+        if self._run_seconds is None:
+            return None
+        return ceil(position / self.max_active) * self._run_seconds
+
+    def stats(self):
+        return {
+            "active": self._active,
+            "max_active": self.max_active,
+            "queued": len(self._queue),
+            "max_queued": self.max_queued,
+            "utilization": self._active / self.max_active,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "abandoned_in_queue": self._abandoned_in_queue,
+            "avg_wait_seconds": self._total_wait_seconds / self._admitted if self._admitted else 0.0,
+            "max_wait_seconds": self._max_wait_seconds,
+            "avg_run_seconds": self._run_seconds,
+        }
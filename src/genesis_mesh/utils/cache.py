@@ -0,0 +1,111 @@
+from abc import ABC, abstractmethod
+from asyncio import CancelledError, Task, create_task, shield
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from time import monotonic
+from typing import Any
+
+
+class CacheBackend(ABC):
+    """Async key/value store with per-entry TTLs.
+
+    Values must be JSON serializable so that a backend shared between workers (e.g. Redis) can be plugged in
+    without changing the callers.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Any | None: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl_seconds: float | None = None): ...
+
+    @abstractmethod
+    def stats(self) -> dict[str, Any]: ...
+
+
+class TTLCache(CacheBackend):
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= monotonic():
+            del self._entries[key]
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl_seconds: float | None = None):
+        expires_at = monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def stats(self):
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": self._hits / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+        }
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one in-flight call whose result every caller shares"""
+
+    def __init__(self):
+        self._calls: dict[str, tuple[Task, list[int]]] = {}
+        self._executed = 0
+        self._coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]):
+        if key in self._calls:
+            task, waiters = self._calls[key]
+            self._coalesced += 1
+        else:
+            task = create_task(fn())  # type: ignore
+            waiters = [0]
+            self._calls[key] = (task, waiters)
+            self._executed += 1
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        waiters[0] += 1
+        try:
+            return await shield(task)
+        except CancelledError:
+            # The shared call is only abandoned once nobody is waiting on it anymore
+            if waiters[0] == 1 and not task.done():
+                self._forget(key, task)
+                task.cancel()
+            raise
+        finally:
+            waiters[0] -= 1
+
+    def _forget(self, key: str, task: Task):
+        if key in self._calls and self._calls[key][0] is task:
+            del self._calls[key]
+
+    def stats(self):
+        return {
+            "in_flight": len(self._calls),
+            "executed": self._executed,
+            "coalesced": self._coalesced,
+        }
@@ -0,0 +1,112 @@
+from asyncio import Task, create_task, sleep
+from collections.abc import AsyncIterator, Collection
+from contextlib import asynccontextmanager
+from logging import getLogger
+from pathlib import Path
+from time import time
+from uuid import UUID
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+
+logger = getLogger()
+
+# 100 ns intervals between the Gregorian epoch used by UUIDv6 and the Unix epoch
+GREGORIAN_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def checkpoint_id_at(timestamp: float) -> str:
+    """Smallest checkpoint id of the given time, ids are UUIDv6 so they sort by creation time"""
+
+    ticks = int(timestamp * 10**7) + GREGORIAN_EPOCH_OFFSET
+    return str(UUID(int=(ticks >> 12) << 80 | (0x6000 | ticks & 0x0FFF) << 64 | 0x8000 << 48))
+
+
+@asynccontextmanager
+async def open_checkpointer(backend: str, path: str) -> AsyncIterator[BaseCheckpointSaver | None]:
+    """Opens the checkpoint store graph runs persist their progress to, `none` disables checkpointing"""
+
+    if backend == "sqlite":
+        # Only imported when used, so the other backends do not need the SQLite driver
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        async with AsyncSqliteSaver.from_conn_string(path) as checkpointer:
+            yield checkpointer
+    elif backend == "memory":
+        yield MemorySaver()
+    else:
+        yield None
+
+
+class CheckpointPruner:
+    """Deletes the checkpoints of runs that have not advanced for `ttl_seconds`, so the store does not grow forever.
+
+    Finished runs stay resumable, and replay their blog, until they expire. Runs in `active_thread_ids` are kept
+    regardless of age.
+    """
+
+    def __init__(
+        self,
+        checkpointer: BaseCheckpointSaver,
+        ttl_seconds: float,
+        interval_seconds: float,
+        active_thread_ids: Collection[str] = (),
+    ):
+        self.checkpointer = checkpointer
+        self.ttl_seconds = ttl_seconds
+        self.interval_seconds = interval_seconds
+        self.active_thread_ids = active_thread_ids
+        self._task: Task | None = None
+        self._pruned_threads = 0
+
+    async def start(self):
+        self._task = create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.prune()
+            except Exception:
+                logger.exception(msg="Failed to prune checkpoints")
+            await sleep(self.interval_seconds)
+
+    async def prune(self) -> int:
+        cutoff = checkpoint_id_at(time() - self.ttl_seconds)
+        if isinstance(self.checkpointer, MemorySaver):
+            thread_ids = [
+                thread_id
+                for thread_id, namespaces in self.checkpointer.storage.items()
+                if max((checkpoint_id for ns in namespaces.values() for checkpoint_id in ns), default="") < cutoff
+                and thread_id not in self.active_thread_ids
+            ]
+            for thread_id in thread_ids:
+                self.checkpointer.delete_thread(thread_id)
+        else:
+            thread_ids = await self._prune_sqlite(cutoff)
+        if thread_ids:
+            logger.info("Pruned checkpoints of %d expired runs", len(thread_ids))
+        self._pruned_threads += len(thread_ids)
+        return len(thread_ids)
+
+    async def _prune_sqlite(self, cutoff: str) -> list[str]:
+        # The SQLite saver of this langgraph version has no thread deletion of its own
+        checkpointer = self.checkpointer
+        await checkpointer.setup()  # type: ignore
+        async with checkpointer.lock, checkpointer.conn.cursor() as cur:  # type: ignore
+            await cur.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(checkpoint_id) < ?", (cutoff,)
+            )
+            thread_ids = [thread_id for (thread_id,) in await cur.fetchall() if thread_id not in self.active_thread_ids]
+            params = [(thread_id,) for thread_id in thread_ids]
+            await cur.executemany("DELETE FROM writes WHERE thread_id = ?", params)
+            await cur.executemany("DELETE FROM checkpoints WHERE thread_id = ?", params)
+            await checkpointer.conn.commit()  # type: ignore
+        return thread_ids
+
+    def stats(self):
+        return {"ttl_seconds": self.ttl_seconds, "pruned_threads": self._pruned_threads}
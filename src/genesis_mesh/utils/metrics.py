@@ -0,0 +1,54 @@
+from prometheus_client import Counter, Histogram
+
+# Graph nodes and tool calls run from milliseconds (cache hits) to minutes (a section's full research)
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+NODE_DURATION = Histogram(
+    "genesis_mesh_node_duration_seconds",
+    "Time spent in a graph node",
+    ["graph", "node"],
+    buckets=DURATION_BUCKETS,
+)
+NODE_OUTPUT_BYTES = Counter(
+    "genesis_mesh_node_output_bytes",
+    "Bytes of text in the state updates of a graph node",
+    ["graph", "node"],
+)
+NODE_ERRORS = Counter(
+    "genesis_mesh_node_errors",
+    "Graph node runs that raised",
+    ["graph", "node"],
+)
+TOOL_DURATION = Histogram(
+    "genesis_mesh_tool_duration_seconds",
+    "Time spent in a tool call",
+    ["tool"],
+    buckets=DURATION_BUCKETS,
+)
+TOOL_OUTPUT_BYTES = Counter(
+    "genesis_mesh_tool_output_bytes",
+    "Bytes of text returned by a tool",
+    ["tool"],
+)
+TOOL_ERRORS = Counter(
+    "genesis_mesh_tool_errors",
+    "Tool calls that raised",
+    ["tool"],
+)
+LLM_DURATION = Histogram(
+    "genesis_mesh_llm_duration_seconds",
+    "Time spent in an LLM call",
+    ["node", "model"],
+    buckets=DURATION_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "genesis_mesh_llm_tokens",
+    "Tokens reported by the LLM provider",
+    ["node", "model", "kind"],
+)
+RUN_DURATION = Histogram(
+    "genesis_mesh_run_duration_seconds",
+    "Duration of a blog run",
+    ["outcome"],
+    buckets=DURATION_BUCKETS,
+)
@@ -0,0 +1,80 @@
+from collections import OrderedDict
+from functools import lru_cache
+from logging import getLogger
+from threading import Lock
+
+from tiktoken import Encoding, encoding_name_for_model, get_encoding
+
+logger = getLogger()
+
+DEFAULT_ENCODING = "cl100k_base"
+# Used only when no BPE encoding can be loaded, e.g. on hosts without access to the tiktoken cache
+CHARS_PER_TOKEN_ESTIMATE = 4
+# Role markers and the fixed human turn that every prompt carries on top of the system instructions
+MESSAGE_OVERHEAD_TOKENS = 64
+TRUNCATION_MARKER = "... [truncated]"
+
+
+@lru_cache
+def get_model_encoding(model: str) -> Encoding | None:
+    try:
+        encoding_name = encoding_name_for_model(model)
+    except KeyError:
+        # Self-hosted models are unknown to tiktoken, a common BPE is still far closer than a character estimate
+        encoding_name = DEFAULT_ENCODING
+    try:
+        return get_encoding(encoding_name)
+    except (OSError, ValueError):
+        logger.warning("No tokenizer available for %s, falling back to a character estimate", model)
+        return None
+
+
+class TokenBudget:
+    """Token accounting for one model: memoized counts and fitting prompt context into the model's window"""
+
+    def __init__(self, model: str, context_window: int, max_completion_tokens: int, cache_size: int = 8192):
+        self.model = model
+        self.context_window = context_window
+        self.max_completion_tokens = max_completion_tokens
+        self.encoding = get_model_encoding(model)
+        self.cache_size = cache_size
+        # Keyed by (hash, length) so the cache never keeps large prompt strings alive
+        self._counts: OrderedDict[tuple[int, int], int] = OrderedDict()
+        # Source packing counts tokens in worker threads
+        self._counts_lock = Lock()
+
+    def count(self, text: str) -> int:
+        key = (hash(text), len(text))
+        with self._counts_lock:
+            if (cached_count := self._counts.get(key)) is not None:
+                self._counts.move_to_end(key)
+                return cached_count
+
+        if self.encoding is None:
+            token_count = -(-len(text) // CHARS_PER_TOKEN_ESTIMATE)
+        else:
+            token_count = len(self.encoding.encode(text, disallowed_special=()))
+        with self._counts_lock:
+            self._counts[key] = token_count
+            if len(self._counts) > self.cache_size:
+                self._counts.popitem(last=False)
+        return token_count
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self.count(text) <= max_tokens:
+            return text
+        marker_tokens = self.count(TRUNCATION_MARKER)
+        keep_tokens = max(max_tokens - marker_tokens, 0)
+        if self.encoding is None:
+            return text[: keep_tokens * CHARS_PER_TOKEN_ESTIMATE] + TRUNCATION_MARKER
+        tokens = self.encoding.encode(text, disallowed_special=())
+        return self.encoding.decode(tokens[:keep_tokens]) + TRUNCATION_MARKER
+
+    def context_budget(self, template: str, **template_args: str) -> int:
+        """Tokens left for the `context` slot of a prompt template once everything else is accounted for"""
+
+        fixed_prompt = template.format(context="", **template_args)
+        return max(
+            self.context_window - self.max_completion_tokens - self.count(fixed_prompt) - MESSAGE_OVERHEAD_TOKENS,
+            0,
+        )
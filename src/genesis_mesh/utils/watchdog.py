@@ -0,0 +1,68 @@
+from asyncio import Task, create_task, sleep
+from logging import getLogger
+from sys import _current_frames
+from threading import Event, Thread, get_ident
+from time import monotonic
+from traceback import format_stack
+
+logger = getLogger()
+
+
+class EventLoopWatchdog:
+    """Debug helper that logs the event loop's stack whenever a callback holds the loop past a threshold.
+
+    A heartbeat task stamps the time on every loop iteration it gets, and a daemon thread checks the stamp. When
+    the stamp goes stale the loop is stuck in a single callback, so the thread samples the loop thread's stack.
+    """
+
+    def __init__(self, threshold_seconds: float, interval_seconds: float):
+        self.threshold_seconds = threshold_seconds
+        self.interval_seconds = interval_seconds
+        self._last_beat = monotonic()
+        self._reported_beat = 0.0
+        self._loop_thread_id = 0
+        self._stopped = Event()
+        self._heartbeat_task: Task | None = None
+        self._thread: Thread | None = None
+        self._blocked_events = 0
+
+    async def start(self):
+        self._loop_thread_id = get_ident()
+        self._last_beat = monotonic()
+        self._stopped.clear()
+        self._heartbeat_task = create_task(self._heartbeat())
+        self._thread = Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+        if self._thread:
+            self._thread.join(timeout=self.interval_seconds * 5)
+
+    async def _heartbeat(self):
+        while True:
+            self._last_beat = monotonic()
+            await sleep(self.interval_seconds)
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval_seconds):
+            last_beat = self._last_beat
+            blocked_for = monotonic() - last_beat - self.interval_seconds
+            if blocked_for < self.threshold_seconds or last_beat == self._reported_beat:
+                continue
+
+            # Only report each stall once, the stack is sampled while the loop is still blocked
+            self._reported_beat = last_beat
+            self._blocked_events += 1
+            frame = _current_frames().get(self._loop_thread_id)
+            stack = "".join(format_stack(frame)) if frame else "<unavailable>"
+            logger.warning(
+                "Event loop blocked for at least %.0f ms, current stack:\n%s",
+                blocked_for * 1000,
+                stack,
+            )
+
+    def stats(self):
+        return {"blocked_events": self._blocked_events}